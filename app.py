@@ -2,15 +2,28 @@
 
 import streamlit as st
 import tensorflow as tf
-from tensorflow import keras
 import numpy as np
-from PIL import Image
 import pandas as pd
 import plotly.graph_objects as go
 from gtts import gTTS
 import tempfile
 import os
 
+from cascade_predictor import DEFAULT_THRESHOLD, load_predictor
+from image_pipeline import ImagePipeline
+from leaf_gate import GATE_MODEL_PATH, is_valid_leaf_image, load_leaf_gate
+from inference_engine import MicroBatchInferenceEngine
+from prediction_cache import PredictionCache
+
+# PLANT_MODEL_PATH picks the artifact (.h5, .tflite, .onnx or a SavedModel
+# directory); PLANT_MODEL_BACKEND can force a runtime instead of detecting it
+MODEL_PATH = os.environ.get('PLANT_MODEL_PATH', 'models/best_model.h5')
+# PLANT_FAST_MODEL_PATH puts a compact model in front; MODEL_PATH then only
+# sees uploads the fast model is less than PLANT_CASCADE_THRESHOLD sure about
+FAST_MODEL_PATH = os.environ.get('PLANT_FAST_MODEL_PATH')
+CASCADE_THRESHOLD = float(os.environ.get('PLANT_CASCADE_THRESHOLD', DEFAULT_THRESHOLD))
+LEAF_GATE_PATH = os.environ.get('PLANT_GATE_MODEL_PATH', GATE_MODEL_PATH)
+
 # Page configuration
 st.set_page_config(
     page_title="Medicinal Plant Classifier",
@@ -539,63 +552,56 @@ PLANT_INFO = {
 def load_model():
     """Load the trained model"""
     try:
-        model = keras.models.load_model('models/best_model.h5')
+        model = load_predictor(MODEL_PATH, FAST_MODEL_PATH, CASCADE_THRESHOLD)
         return model
     except Exception as e:
         st.error(f"Error loading model: {e}")
         return None
 
 
-def preprocess_image(image, target_size=(224, 224)):
-    """Preprocess image for model prediction"""
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
-    image = image.resize(target_size)
-    img_array = np.array(image)
-    img_array = img_array / 255.0
-    img_array = np.expand_dims(img_array, axis=0)
-    return img_array
+@st.cache_resource
+def load_gate():
+    """Cheap leaf / not-leaf first stage (colour heuristic until a gate model is trained)"""
+    return load_leaf_gate(LEAF_GATE_PATH, fallback=is_valid_leaf_image)
 
 
-def is_valid_leaf_image(image):
-    """
-    Simple and aggressive check for leaf images
-    Returns: (is_valid, reason)
-    """
-    img_array = np.array(image.convert('RGB'))
-
-    # Check 1: Image dimensions
-    width, height = image.size
-    if width < 50 or height < 50:
-        return False, "Image is too small. Please upload a larger image."
+@st.cache_resource
+def load_inference_engine(_model):
+    """Shared engine that merges concurrent sessions' requests into one batch"""
+    return MicroBatchInferenceEngine(_model.predict, max_batch_size=32, max_wait_ms=5.0)
 
-    # Check 2: Calculate average colors
-    avg_color = img_array.mean(axis=(0, 1))
-    red, green, blue = avg_color
 
-    # AGGRESSIVE CHECK: Leaves MUST have dominant green channel
-    # OR be brownish (dried leaves)
-    is_greenish = (green > red * 1.1 and green > blue * 1.1)  # Green dominant
-    is_dried_brown = (red > 100 and green > 80 and abs(red - green) < 30 and blue < green)
+@st.cache_resource
+def load_prediction_cache(_model):
+    """Per-upload result cache shared by all sessions (PLANT_CACHE_DIR adds a disk tier)"""
+    # Cached validation outcomes depend on the gate, so its version is part of the key
+    gate = load_gate()
+    namespace = (_model.metadata or {}).get('checksum', MODEL_PATH)
+    if gate.learned:
+        namespace += (gate.backend.metadata or {}).get('checksum', LEAF_GATE_PATH)
+    return PredictionCache(max_entries=256, disk_dir=os.environ.get('PLANT_CACHE_DIR'), namespace=namespace)
 
-    if not (is_greenish or is_dried_brown):
-        return False, "NOT A LEAF - No green plant color detected. This app ONLY works with plant leaves!"
 
-    # Check 3: Brightness
-    brightness = img_array.mean()
-    if brightness < 30:
-        return False, "Image is too dark."
-    if brightness > 240:
-        return False, "Image is too bright."
+def get_upload_state(uploaded_file):
+    """
+    Session-scoped store for the current upload.
 
-    return True, "Valid"
+    Widget interactions rerun the whole script; everything derived from
+    the upload (decoded image, validation outcome, probabilities, chart)
+    lives here so reruns re-render instead of recomputing. Only the
+    current upload is kept, and a new upload starts a fresh store.
+    """
+    upload_id = getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
+    state = st.session_state.get('upload_state')
+    if state is None or state['upload_id'] != upload_id:
+        state = {'upload_id': upload_id}
+        st.session_state.upload_state = state
+    return state
 
 
-def predict_plant(model, image):
-    """Make prediction on the image"""
-    processed_image = preprocess_image(image)
-    predictions = model.predict(processed_image, verbose=0)
-    return predictions[0]
+def predict_plant(model, pipeline):
+    """Make prediction on the pipeline's 224x224 uint8 model input"""
+    return load_inference_engine(model).predict(pipeline.model_input)
 
 
 def create_confidence_chart(predictions, class_names):
@@ -710,11 +716,11 @@ def main():
     model = load_model()
 
     if model is None:
-        st.error("⚠️ Failed to load the model. Please check if 'models/best_model.h5' exists.")
+        st.error(f"⚠️ Failed to load the model. Please check if '{MODEL_PATH}' exists.")
         return
 
-    # Get class names
-    class_names = sorted(PLANT_INFO.keys())
+    # Get class names from the model's metadata (legacy models: the database keys)
+    class_names = model.class_names or sorted(PLANT_INFO.keys())
 
     # File uploader
     st.markdown("### 📤 Upload Leaf Image")
@@ -726,34 +732,56 @@ def main():
 
     if uploaded_file is not None:
 
+        upload_state = get_upload_state(uploaded_file)
+        prediction_cache = load_prediction_cache(model)
+        if 'cache_key' not in upload_state:
+            # Results for these exact bytes are reused across sessions and re-uploads
+            upload_state['cache_key'] = prediction_cache.key_for(uploaded_file.getvalue())
+            upload_state['cached'] = prediction_cache.get(upload_state['cache_key']) or {}
+            # Reads only the header now; pixels are decoded once, on first use
+            upload_state['pipeline'] = ImagePipeline(uploaded_file)
+        cache_key, cached = upload_state['cache_key'], upload_state['cached']
+        pipeline = upload_state['pipeline']
+
         col1, col2 = st.columns([1, 1])
 
         with col1:
             st.markdown("### 🖼️ Input Image")
-            image = Image.open(uploaded_file)
-            st.image(image, caption="Uploaded Leaf Image", use_column_width=True)
+            st.image(uploaded_file.getvalue(), caption="Uploaded Leaf Image", use_column_width=True)
 
             # INLINE VALIDATION CHECK - v2.0
-            img_arr = np.array(image.convert('RGB'))
-            r_avg, g_avg, b_avg = img_arr.mean(axis=(0, 1))
-
-            # Simple green check
-            is_leaf_color = (g_avg > r_avg * 1.05) or (
-                        r_avg > 100 and g_avg > 80 and abs(r_avg - g_avg) < 35 and b_avg < g_avg)
+            if 'avg_rgb' not in cached:
+                cached['avg_rgb'] = pipeline.leaf_stats['avg_rgb']
+                prediction_cache.put(cache_key, cached)
+            r_avg, g_avg, b_avg = cached['avg_rgb']
+
+            # A trained leaf gate decides up front; otherwise a simple green check
+            leaf_gate = load_gate()
+            if leaf_gate.learned:
+                if 'is_valid' not in cached:
+                    cached['is_valid'], cached['validation_message'] = leaf_gate.check(pipeline)
+                    prediction_cache.put(cache_key, cached)
+                is_leaf_color = cached['is_valid']
+            else:
+                is_leaf_color = (g_avg > r_avg * 1.05) or (
+                            r_avg > 100 and g_avg > 80 and abs(r_avg - g_avg) < 35 and b_avg < g_avg)
 
             if not is_leaf_color:
                 st.error(
                     f"⚠️ **Image Validation Failed!**\n\nAvg Colors - R:{r_avg:.0f}, G:{g_avg:.0f}, B:{b_avg:.0f}\n\nThis doesn't appear to be a plant leaf!")
-                st.info("Green should be dominant for leaves. Your image has red/skin tones.")
+                if leaf_gate.learned:
+                    st.info(cached['validation_message'])
+                else:
+                    st.info("Green should be dominant for leaves. Your image has red/skin tones.")
 
             # Image info
             st.markdown(
                 f"""
                 <div style='background: white; padding: 1rem; border-radius: 10px; margin-top: 1rem;'>
                     <strong>Image Details:</strong><br>
-                    📐 Size: {image.size[0]} x {image.size[1]} pixels<br>
-                    🎨 Mode: {image.mode}<br>
-                    📁 Format: {image.format}<br>
+                    📐 Size: {pipeline.size[0]} x {pipeline.size[1]} pixels<br>
+                    🎨 Mode: {pipeline.mode}<br>
+                    📁 Format: {pipeline.format}<br>
                     🎨 Avg RGB: ({r_avg:.0f}, {g_avg:.0f}, {b_avg:.0f})
                 </div>
                 """,
@@ -807,7 +835,10 @@ def main():
 
             # STEP 1: Validate if image is actually a leaf
             if not skip_validation:
-                is_valid, validation_message = is_valid_leaf_image(image)
+                if 'is_valid' not in cached:
+                    cached['is_valid'], cached['validation_message'] = leaf_gate.check(pipeline)
+                    prediction_cache.put(cache_key, cached)
+                is_valid, validation_message = cached['is_valid'], cached['validation_message']
 
                 if not is_valid:
                     # Image doesn't look like a leaf!
@@ -854,7 +885,19 @@ def main():
 
             # STEP 2: If valid or bypassed, proceed with prediction
             with st.spinner("🔬 Analyzing leaf characteristics with AI..."):
-                predictions = predict_plant(model, image)
+                if 'predictions' not in cached:
+                    cached['predictions'] = predict_plant(model, pipeline)
+                    prediction_cache.put(cache_key, cached)
+                predictions = cached['predictions']
+                if 'chart' not in upload_state:
+                    upload_state['chart'] = create_confidence_chart(predictions, class_names)
+                cache_stats = prediction_cache.get_stats()
+                st.sidebar.caption(f"⚡ Prediction cache: {cache_stats['hits']} hits / "
+                                   f"{cache_stats['misses']} misses")
+                if hasattr(model, 'get_stats'):
+                    cascade_stats = model.get_stats()
+                    st.sidebar.caption(f"🪜 Cascade: {cascade_stats['escalation_rate'] * 100:.0f}% escalated, "
+                                       f"{cascade_stats['avg_ms_per_image']:.1f} ms/img")
                 predicted_idx = np.argmax(predictions)
                 predicted_class = class_names[predicted_idx]
                 confidence = predictions[predicted_idx] * 100
@@ -938,7 +981,7 @@ def main():
         if confidence >= CONFIDENCE_THRESHOLD:
             st.markdown("### 📊 Confidence Distribution")
             st.caption("Top 5 predictions with confidence scores")
-            fig = create_confidence_chart(predictions, class_names)
+            fig = upload_state['chart']
             st.plotly_chart(fig, use_container_width=True)
 
             # Plant information with beautiful cards
@@ -1071,7 +1114,7 @@ def main():
             # Show top 5 anyway for reference
             st.markdown("### 📊 Top 5 Closest Matches (For Reference Only)")
             st.warning("⚠️ These predictions are unreliable due to low confidence!")
-            fig = create_confidence_chart(predictions, class_names)
+            fig = upload_state['chart']
             st.plotly_chart(fig, use_container_width=True)
 
     else:
@@ -1,14 +1,26 @@
 import streamlit as st
-import tensorflow as tf
-from tensorflow import keras
 import numpy as np
-from PIL import Image
 import pandas as pd
 import plotly.graph_objects as go
 from gtts import gTTS
 import tempfile
 import os
 
+from cascade_predictor import DEFAULT_THRESHOLD, load_predictor
+from image_pipeline import ImagePipeline
+from leaf_gate import GATE_MODEL_PATH, check_if_plant_image, load_leaf_gate
+from inference_engine import MicroBatchInferenceEngine
+from prediction_cache import PredictionCache
+
+# PLANT_MODEL_PATH picks the artifact (.h5, .tflite, .onnx or a SavedModel
+# directory); PLANT_MODEL_BACKEND can force a runtime instead of detecting it
+MODEL_PATH = os.environ.get('PLANT_MODEL_PATH', 'models/best_model.h5')
+# PLANT_FAST_MODEL_PATH puts a compact model in front; MODEL_PATH then only
+# sees uploads the fast model is less than PLANT_CASCADE_THRESHOLD sure about
+FAST_MODEL_PATH = os.environ.get('PLANT_FAST_MODEL_PATH')
+CASCADE_THRESHOLD = float(os.environ.get('PLANT_CASCADE_THRESHOLD', DEFAULT_THRESHOLD))
+LEAF_GATE_PATH = os.environ.get('PLANT_GATE_MODEL_PATH', GATE_MODEL_PATH)
+
 # Import the chatbot
 from chatbot_engine import MedicinalPlantChatbot
 
@@ -480,67 +492,39 @@ if 'chatbot' not in st.session_state:
 def load_model():
     """Load the trained model"""
     try:
-        model = keras.models.load_model('models/best_model.h5')
+        model = load_predictor(MODEL_PATH, FAST_MODEL_PATH, CASCADE_THRESHOLD)
         return model
     except Exception as e:
         st.error(f"Error loading model: {e}")
         return None
 
 
-def check_if_plant_image(image):
-    """
-    Check if the image likely contains a plant/leaf
-    Returns: (is_plant, reason)
-    """
-    img_array = np.array(image.convert('RGB'))
-
-    # Check 1: Green pixel ratio (plants are usually green)
-    hsv_img = tf.image.rgb_to_hsv(img_array / 255.0).numpy()
-
-    # Define green hue range (roughly 60-180 degrees in HSV)
-    green_hue_min = 0.16  # ~60 degrees
-    green_hue_max = 0.5  # ~180 degrees
-
-    green_mask = (hsv_img[:, :, 0] >= green_hue_min) & (hsv_img[:, :, 0] <= green_hue_max)
-    green_mask = green_mask & (hsv_img[:, :, 1] > 0.2)  # Sufficient saturation
-
-    green_ratio = np.sum(green_mask) / green_mask.size
-
-    # Check 2: Skin tone detection (to reject human images)
-    skin_hue_min = 0.0
-    skin_hue_max = 0.1  # ~0-36 degrees (orange-ish)
-
-    skin_mask = (hsv_img[:, :, 0] >= skin_hue_min) & (hsv_img[:, :, 0] <= skin_hue_max)
-    skin_mask = skin_mask & (hsv_img[:, :, 1] > 0.15) & (hsv_img[:, :, 1] < 0.7)
-
-    skin_ratio = np.sum(skin_mask) / skin_mask.size
-
-    # Decision logic
-    if skin_ratio > 0.15:  # More than 15% skin tones
-        return False, "This appears to be a photo of a person, not a plant. Please upload a clear image of a plant leaf."
+@st.cache_resource
+def load_gate():
+    """Cheap leaf / not-leaf first stage (colour heuristic until a gate model is trained)"""
+    return load_leaf_gate(LEAF_GATE_PATH, fallback=check_if_plant_image)
 
-    if green_ratio < 0.10:  # Less than 10% green
-        return False, "This image doesn't appear to contain a plant. Please upload a clear leaf image with visible green color."
 
-    return True, "Image validation passed"
+@st.cache_resource
+def load_inference_engine(_model):
+    """Shared engine that merges concurrent sessions' requests into one batch"""
+    return MicroBatchInferenceEngine(_model.predict, max_batch_size=32, max_wait_ms=5.0)
 
 
-def preprocess_image(image, target_size=(224, 224)):
-    """Preprocess image for model prediction"""
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
-    image = image.resize(target_size)
-    img_array = np.array(image)
-    img_array = img_array / 255.0
-    img_array = np.expand_dims(img_array, axis=0)
-    return img_array
+@st.cache_resource
+def load_prediction_cache(_model):
+    """Per-upload result cache shared by all sessions (PLANT_CACHE_DIR adds a disk tier)"""
+    # Cached validation outcomes depend on the gate, so its version is part of the key
+    gate = load_gate()
+    namespace = (_model.metadata or {}).get('checksum', MODEL_PATH)
+    if gate.learned:
+        namespace += (gate.backend.metadata or {}).get('checksum', LEAF_GATE_PATH)
+    return PredictionCache(max_entries=256, disk_dir=os.environ.get('PLANT_CACHE_DIR'), namespace=namespace)
 
 
-def predict_plant(model, image):
-    """Make prediction on the image"""
-    processed_image = preprocess_image(image)
-    predictions = model.predict(processed_image, verbose=0)
-    return predictions[0]
+def predict_plant(model, pipeline):
+    """Make prediction on the pipeline's 224x224 uint8 model input"""
+    return load_inference_engine(model).predict(pipeline.model_input)
 
 
 def create_confidence_chart(predictions, class_names):
@@ -700,17 +684,26 @@ def main():
         if uploaded_file:
             model = load_model()
             if model:
-                image = Image.open(uploaded_file)
+                # Results for these exact bytes are reused across reruns, sessions and re-uploads
+                prediction_cache = load_prediction_cache(model)
+                cache_key = prediction_cache.key_for(uploaded_file.getvalue())
+                cached = prediction_cache.get(cache_key) or {}
+
+                # Reads only the header now; pixels are decoded once, on first use
+                pipeline = ImagePipeline(uploaded_file)
 
                 col1, col2 = st.columns([1, 2])
 
                 with col1:
-                    st.image(image, caption="Uploaded Image", width=300)
+                    st.image(uploaded_file.getvalue(), caption="Uploaded Image", width=300)
 
                 with col2:
                     with st.spinner("Validating image..."):
                         # CRITICAL: Check if it's a plant image first
-                        is_plant, reason = check_if_plant_image(image)
+                        if 'is_plant' not in cached:
+                            cached['is_plant'], cached['reason'] = load_gate().check(pipeline)
+                            prediction_cache.put(cache_key, cached)
+                        is_plant, reason = cached['is_plant'], cached['reason']
 
                         if not is_plant:
                             st.markdown(
@@ -726,8 +719,19 @@ def main():
                         else:
                             # Proceed with classification
                             with st.spinner("Analyzing plant..."):
-                                class_names = sorted(PLANT_INFO.keys())
-                                predictions = predict_plant(model, image)
+                                class_names = model.class_names or sorted(PLANT_INFO.keys())
+                                if 'predictions' not in cached:
+                                    cached['predictions'] = predict_plant(model, pipeline)
+                                    prediction_cache.put(cache_key, cached)
+                                predictions = cached['predictions']
+                                cache_stats = prediction_cache.get_stats()
+                                st.sidebar.caption(f"⚡ Prediction cache: {cache_stats['hits']} hits / "
+                                                   f"{cache_stats['misses']} misses")
+                                if hasattr(model, 'get_stats'):
+                                    cascade_stats = model.get_stats()
+                                    st.sidebar.caption(
+                                        f"🪜 Cascade: {cascade_stats['escalation_rate'] * 100:.0f}% escalated, "
+                                        f"{cascade_stats['avg_ms_per_image']:.1f} ms/img")
                                 predicted_idx = np.argmax(predictions)
                                 predicted_class = class_names[predicted_idx]
                                 confidence = predictions[predicted_idx] * 100
@@ -0,0 +1,158 @@
+import os
+import time
+import argparse
+import numpy as np
+
+from inference_backends import InferenceBackend, load_backend
+
+DEFAULT_THRESHOLD = 0.7
+
+
+class CascadePredictor(InferenceBackend):
+    """
+    Two-stage classifier: a cheap model answers when it is confident, the
+    heavy model only sees the images it is unsure about.
+
+    The fast model runs on every image; rows whose top-1 probability is
+    below `threshold` are re-run through the accurate model and take its
+    probabilities. Raising the threshold escalates more images (closer to
+    the accurate model's accuracy), lowering it saves more compute.
+
+    Both stages must share input shape and label order. The cascade is
+    itself an InferenceBackend, so anything that takes a backend
+    (predict.py, the apps, the micro-batch engine) can use it unchanged.
+    """
+
+    name = 'cascade'
+
+    def __init__(self, fast, accurate, threshold=DEFAULT_THRESHOLD):
+        """
+        Args:
+            fast: InferenceBackend for the compact first-stage model
+            accurate: InferenceBackend for the heavy model (MobileNetV2)
+            threshold: Top-1 probability below which an image is escalated
+        """
+        if tuple(fast.input_shape) != tuple(accurate.input_shape):
+            raise ValueError(f"Cascade stages need the same input shape, got "
+                             f"{fast.input_shape} and {accurate.input_shape}")
+        if fast.class_names and accurate.class_names and fast.class_names != accurate.class_names:
+            raise ValueError("Cascade stages were trained with different class lists")
+
+        self.fast = fast
+        self.accurate = accurate
+        self.threshold = threshold
+        self.input_shape = accurate.input_shape
+        self.num_classes = accurate.num_classes
+        self.class_names = accurate.class_names or fast.class_names
+
+        # Cached results depend on both stages, so both checksums identify the cascade
+        self.metadata = dict(accurate.metadata or {})
+        self.metadata['checksum'] = ''.join(
+            (m or {}).get('checksum', '') for m in (accurate.metadata, fast.metadata))
+
+        self.timings = {
+            'time_to_first_prediction_s': sum(b.timings['time_to_first_prediction_s']
+                                              for b in (fast, accurate) if hasattr(b, 'timings'))
+        }
+
+        self.images = 0
+        self.escalated = 0
+        self.fast_time = 0.0
+        self.accurate_time = 0.0
+
+    def predict(self, batch):
+        start = time.perf_counter()
+        probabilities = np.array(self.fast.predict(batch), dtype=np.float32)
+        self.fast_time += time.perf_counter() - start
+
+        unsure = np.flatnonzero(probabilities.max(axis=1) < self.threshold)
+        if len(unsure):
+            start = time.perf_counter()
+            probabilities[unsure] = self.accurate.predict(np.asarray(batch)[unsure])
+            self.accurate_time += time.perf_counter() - start
+
+        self.images += len(probabilities)
+        self.escalated += len(unsure)
+        return probabilities
+
+    def warm_up(self):
+        self.fast.warm_up()
+        self.accurate.warm_up()
+
+    def get_stats(self):
+        """Escalation rate and average cost per image so far"""
+        images = max(self.images, 1)
+        return {
+            'images': self.images,
+            'escalated': self.escalated,
+            'escalation_rate': self.escalated / images,
+            'fast_ms_per_image': self.fast_time / images * 1000,
+            'accurate_ms_per_image': self.accurate_time / images * 1000,
+            'avg_ms_per_image': (self.fast_time + self.accurate_time) / images * 1000
+        }
+
+
+def load_predictor(model_path, fast_model_path=None, threshold=DEFAULT_THRESHOLD, backend=None):
+    """The model at model_path, behind a fast first stage if fast_model_path is given"""
+    accurate = load_backend(model_path, backend)
+    if not fast_model_path:
+        return accurate
+    return CascadePredictor(load_backend(fast_model_path, backend), accurate, threshold)
+
+
+def run_threshold_sweep(fast_path, accurate_path, validation_dir, thresholds, batch_size=32):
+    """
+    Accuracy, escalation rate and average cost per image of the cascade
+    at each threshold, from one pass of each model over validation_dir.
+    """
+    from export_tflite import list_labelled_images, load_uint8_image
+
+    fast = load_backend(fast_path)
+    accurate = load_backend(accurate_path)
+    paths, labels = list_labelled_images(validation_dir)
+
+    fast_probs, accurate_probs = [], []
+    fast_time = accurate_time = 0.0
+    for i in range(0, len(paths), batch_size):
+        batch = np.stack([load_uint8_image(p) for p in paths[i:i + batch_size]])
+
+        start = time.perf_counter()
+        fast_probs.append(fast.predict(batch))
+        fast_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        accurate_probs.append(accurate.predict(batch))
+        accurate_time += time.perf_counter() - start
+
+    fast_probs = np.concatenate(fast_probs)
+    accurate_probs = np.concatenate(accurate_probs)
+    fast_ms = fast_time / len(paths) * 1000
+    accurate_ms = accurate_time / len(paths) * 1000
+
+    print("\n" + "=" * 60)
+    print(f"CASCADE THRESHOLD SWEEP ({len(paths)} images)")
+    print("=" * 60)
+    print(f"Fast model only:     {np.mean(fast_probs.argmax(1) == labels) * 100:6.2f}%  {fast_ms:7.2f} ms/img")
+    print(f"Accurate model only: {np.mean(accurate_probs.argmax(1) == labels) * 100:6.2f}%  {accurate_ms:7.2f} ms/img")
+    print("-" * 60)
+    print(f"{'Threshold':>10} {'Accuracy':>10} {'Escalated':>10} {'ms/img':>10} {'Speedup':>10}")
+    for threshold in thresholds:
+        escalate = fast_probs.max(axis=1) < threshold
+        predictions = np.where(escalate, accurate_probs.argmax(1), fast_probs.argmax(1))
+        cost_ms = fast_ms + escalate.mean() * accurate_ms
+        print(f"{threshold:>10.2f} {np.mean(predictions == labels) * 100:>9.2f}% "
+              f"{escalate.mean() * 100:>9.1f}% {cost_ms:>10.2f} {accurate_ms / cost_ms:>9.1f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep the cascade threshold on the validation set")
+    parser.add_argument('--fast-model', default='models/fast_model.h5')
+    parser.add_argument('--model', default='models/best_model.h5')
+    parser.add_argument('--validation-dir', default='dataset/validation')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.5, 0.6, 0.7, 0.8, 0.9, 0.95])
+    args = parser.parse_args()
+
+    if not os.path.exists(args.fast_model):
+        raise SystemExit(f"❌ No fast model at {args.fast_model}; train one with train_fast_model.py")
+    run_threshold_sweep(args.fast_model, args.model, args.validation_dir, args.thresholds)
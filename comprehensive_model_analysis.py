@@ -3,56 +3,58 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics import confusion_matrix, classification_report, accuracy_score
 from sklearn.metrics import precision_recall_fscore_support
-import tensorflow as tf
-from tensorflow import keras
 import os
 from pathlib import Path
 import pandas as pd
 from collections import defaultdict
 import json
 
+from data_pipeline import ImageFolderDataset
+from inference_backends import load_backend
+
 
 class ModelAnalyzer:
-    def __init__(self, model_path, test_dir, class_names=None):
+    def __init__(self, model_path, test_dir, class_names=None, backend=None, dataset_cache=None,
+                 shards=None):
         """
         Initialize the Model Analyzer
 
         Args:
-            model_path: Path to the saved model
+            model_path: Path to the saved model (any format load_backend accepts)
             test_dir: Path to test dataset directory
             class_names: List of class names (if None, will be inferred)
+            backend: Inference backend name (if None, detected from model_path)
+            dataset_cache: Compiled dataset cache root to stream test images from
+                (if None, images are decoded from test_dir)
+            shards: Shard root of shard_dataset.py to stream test images from instead
         """
-        self.model = keras.models.load_model(model_path)
+        self.model = load_backend(model_path, backend)
         self.test_dir = test_dir
-        self.class_names = class_names
+        self.dataset_cache = dataset_cache
+        self.shards = shards
+        self.class_names = class_names or self.model.class_names
         self.predictions = None
         self.true_labels = None
         self.confidence_scores = None
 
     def load_and_predict(self, img_size=(224, 224), batch_size=32):
         """Load test data and make predictions"""
-        # Create test data generator
-        test_datagen = tf.keras.preprocessing.image.ImageDataGenerator(
-            rescale=1. / 255
-        )
-
-        self.test_generator = test_datagen.flow_from_directory(
-            self.test_dir,
-            target_size=img_size,
-            batch_size=batch_size,
-            class_mode='categorical',
-            shuffle=False
-        )
+        # Test data pipeline; raw uint8 pixels, the backend rescales
+        self.test_data = ImageFolderDataset(self.test_dir, img_size, batch_size, rescale=False,
+                                            compiled=self.dataset_cache, shards=self.shards)
 
         if self.class_names is None:
-            self.class_names = list(self.test_generator.class_indices.keys())
+            self.class_names = self.test_data.class_names
 
         print("Making predictions on test set...")
-        predictions = self.model.predict(self.test_generator, verbose=1)
+        predictions = np.concatenate([
+            self.model.predict(images.numpy())
+            for images, _ in self.test_data.dataset
+        ])
 
         self.confidence_scores = predictions
         self.predictions = np.argmax(predictions, axis=1)
-        self.true_labels = self.test_generator.classes
+        self.true_labels = self.test_data.classes
 
         return predictions
 
@@ -410,11 +412,13 @@ if __name__ == "__main__":
     # Configuration - UPDATED WITH CORRECT PATH
     MODEL_PATH = 'models/best_model.h5'
     TEST_DIR = 'dataset/test'
+    DATASET_CACHE_DIR = 'cache/datasets'
 
     # Create analyzer
     analyzer = ModelAnalyzer(
         model_path=MODEL_PATH,
-        test_dir=TEST_DIR
+        test_dir=TEST_DIR,
+        dataset_cache=DATASET_CACHE_DIR
     )
 
     # Run complete analysis
@@ -0,0 +1,221 @@
+import os
+import math
+import numpy as np
+import tensorflow as tf
+
+from dataset_cache import compile_split, list_image_files
+from shard_dataset import load_shard_index, quarantined_filenames, read_shards, split_shard_dir
+
+# Training augmentation, in ImageDataGenerator's terms (shear is in degrees there too)
+TRAIN_AUGMENTATION = dict(
+    rotation_range=40,  # Rotate images
+    width_shift_range=0.2,  # Shift horizontally
+    height_shift_range=0.2,  # Shift vertically
+    shear_range=0.2,  # Shear transformation
+    zoom_range=0.2,  # Zoom in/out
+    horizontal_flip=True,  # Flip horizontally
+    vertical_flip=True,  # Flip vertically (good for leaves)
+    brightness_range=[0.8, 1.2],  # Adjust brightness
+    fill_mode='nearest'
+)
+
+
+def random_affine_transforms(batch_size, height, width, augmentation):
+    """
+    One random affine transform per image, as the (N, 8) projective
+    vectors ImageProjectiveTransformV3 expects (output -> input pixel).
+
+    Rotation, shifts, shear, per-axis zoom and flips are composed into a
+    single matrix about the image centre, so the whole batch is warped in
+    one op instead of one SciPy call per image.
+    """
+    def uniform(low, high):
+        return tf.random.uniform([batch_size], low, high)
+
+    rotation = augmentation.get('rotation_range', 0) * math.pi / 180
+    shear = augmentation.get('shear_range', 0) * math.pi / 180
+    zoom = augmentation.get('zoom_range', 0)
+    theta = uniform(-rotation, rotation)
+    shear_angle = uniform(-shear, shear)
+    zoom_x = uniform(1 - zoom, 1 + zoom)
+    zoom_y = uniform(1 - zoom, 1 + zoom)
+    shift_x = uniform(-1.0, 1.0) * augmentation.get('width_shift_range', 0) * width
+    shift_y = uniform(-1.0, 1.0) * augmentation.get('height_shift_range', 0) * height
+
+    # Flips are negative zooms
+    if augmentation.get('horizontal_flip'):
+        zoom_x *= tf.where(uniform(0.0, 1.0) < 0.5, -1.0, 1.0)
+    if augmentation.get('vertical_flip'):
+        zoom_y *= tf.where(uniform(0.0, 1.0) < 0.5, -1.0, 1.0)
+
+    # rotation @ shear @ zoom, as in ImageDataGenerator.apply_affine_transform
+    cos, sin = tf.cos(theta), tf.sin(theta)
+    shear_sin, shear_cos = tf.sin(shear_angle), tf.cos(shear_angle)
+    a00 = cos * zoom_x
+    a01 = (-cos * shear_sin - sin * shear_cos) * zoom_y
+    a10 = sin * zoom_x
+    a11 = (-sin * shear_sin + cos * shear_cos) * zoom_y
+
+    # Apply about the centre, then shift
+    cx, cy = (width - 1) / 2.0, (height - 1) / 2.0
+    a02 = cx - a00 * cx - a01 * cy + shift_x
+    a12 = cy - a10 * cx - a11 * cy + shift_y
+    zeros = tf.zeros([batch_size])
+    return tf.stack([a00, a01, a02, a10, a11, a12, zeros, zeros], axis=1)
+
+
+def augment_batch(images, augmentation):
+    """Random geometric and brightness augmentation of a float (N, H, W, 3) batch in [0, 255]"""
+    batch_size = tf.shape(images)[0]
+    height, width = images.shape[1], images.shape[2]
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=random_affine_transforms(batch_size, height, width, augmentation),
+        output_shape=tf.constant([height, width]),
+        fill_value=0.0,
+        interpolation='BILINEAR',
+        fill_mode=augmentation.get('fill_mode', 'nearest').upper()
+    )
+    if augmentation.get('brightness_range'):
+        low, high = augmentation['brightness_range']
+        factors = tf.random.uniform([batch_size, 1, 1, 1], low, high)
+        images = tf.clip_by_value(images * factors, 0.0, 255.0)
+    return images
+
+
+def decode_image_bytes(contents, img_size):
+    """
+    Decode encoded image bytes to a uint8 (H, W, 3) image at img_size.
+    Antialiased bicubic, like PIL's BICUBIC in the inference loader;
+    without antialiasing, downscaled phone photos would alias.
+    """
+    image = tf.io.decode_image(contents, channels=3, expand_animations=False)
+    image = tf.image.resize(image, img_size, method='bicubic', antialias=True)
+    return tf.cast(tf.clip_by_value(tf.round(image), 0.0, 255.0), tf.uint8)
+
+
+def decode_image(path, img_size):
+    """Read and decode one file, see decode_image_bytes"""
+    return decode_image_bytes(tf.io.read_file(path), img_size)
+
+
+class ImageFolderDataset:
+    """
+    A class-folder split as a tf.data input pipeline.
+
+    Replaces ImageDataGenerator.flow_from_directory with the same class
+    order and the same `class_indices`, `classes`, `filenames` and
+    `samples` attributes. Files are read and decoded in parallel (or,
+    with `compiled`, batches are sliced from a split compiled once by
+    dataset_cache.py; with `shards`, images are streamed from the
+    sequential TFRecord shards of shard_dataset.py), augmentation runs
+    in-graph on whole batches, and batches are prefetched with
+    autotuning. Pass `dataset` to Model.fit/evaluate/predict.
+    """
+
+    def __init__(self, data_dir, img_size=(224, 224), batch_size=32, training=False,
+                 augmentation=None, cache=False, rescale=True, seed=None, compiled=None, shards=None):
+        """
+        Args:
+            data_dir: Directory with one sub-folder per class
+            img_size: (height, width) images are resized to
+            batch_size: Images per batch
+            training: Shuffle every epoch and apply `augmentation`
+            augmentation: ImageDataGenerator-style settings (TRAIN_AUGMENTATION)
+            cache: Keep decoded images after the first epoch; True caches in
+                memory, a path caches to that file. Meant for the un-augmented
+                validation/test splits.
+            rescale: Yield float32 in [0, 1]; False yields raw uint8 pixels
+            seed: Shuffle seed
+            compiled: Cache root of dataset_cache.py; the split is compiled
+                (or recompiled, if its files changed) and streamed from
+                its memmap with no decoding
+            shards: Shard root of shard_dataset.py; the split is read from
+                its shards with a few large sequential reads instead of one
+                open() per image, and data_dir itself is never listed
+        """
+        if compiled and shards:
+            raise ValueError("Pass either compiled or shards, not both")
+        self.data_dir = data_dir
+        self.img_size = tuple(img_size)
+        self.batch_size = batch_size
+        self.compiled = compile_split(data_dir, compiled, self.img_size) if compiled else None
+        self.shard_dir = split_shard_dir(data_dir, shards) if shards else None
+        if self.compiled:
+            self.class_names = self.compiled.class_names
+            self.filenames = self.compiled.filenames
+            self.classes = self.compiled.labels
+        elif self.shard_dir:
+            # Records quarantined after the shards were written are filtered out while streaming
+            self.shard_index = load_shard_index(self.shard_dir)
+            self.excluded = quarantined_filenames(self.shard_index)
+            kept = [(f, label) for f, label in zip(self.shard_index['filenames'], self.shard_index['labels'])
+                    if f not in self.excluded]
+            self.class_names = self.shard_index['class_names']
+            self.filenames = [f for f, _ in kept]
+            self.classes = np.array([label for _, label in kept], dtype=np.int64)
+        else:
+            self.class_names, self.filenames, self.classes = list_image_files(data_dir)
+        self.class_indices = {name: i for i, name in enumerate(self.class_names)}
+        self.samples = len(self.filenames)
+        self.num_classes = len(self.class_names)
+        self.dataset = self._build(training, augmentation if training else None, cache, rescale, seed)
+
+    def __len__(self):
+        return math.ceil(self.samples / self.batch_size)
+
+    def _compiled_batches(self, training, seed):
+        """Shuffled (or ordered) index batches gathered from the compiled memmap"""
+        images, labels = self.compiled.images, self.compiled.labels
+        num_classes = self.num_classes
+
+        def gather(indices):
+            # Sorted indices keep the memmap reads near-sequential
+            indices = np.sort(indices)
+            return images[indices], labels[indices]
+
+        def load(indices):
+            x, y = tf.numpy_function(gather, [indices], [tf.uint8, tf.int64])
+            x.set_shape((None, *self.img_size, 3))
+            y.set_shape((None,))
+            return x, tf.one_hot(y, num_classes)
+
+        dataset = tf.data.Dataset.range(self.samples)
+        if training:
+            dataset = dataset.shuffle(self.samples, seed=seed, reshuffle_each_iteration=True)
+        return dataset.batch(self.batch_size).map(load, num_parallel_calls=tf.data.AUTOTUNE)
+
+    def _build(self, training, augmentation, cache, rescale, seed):
+        autotune = tf.data.AUTOTUNE
+        if self.compiled:
+            dataset = self._compiled_batches(training, seed)
+        else:
+            if self.shard_dir:
+                dataset = read_shards(self.shard_dir, self.shard_index, training, seed, self.excluded)
+                decode = decode_image_bytes
+            else:
+                paths = [os.path.join(self.data_dir, f) for f in self.filenames]
+                dataset = tf.data.Dataset.from_tensor_slices((paths, self.classes))
+                if training:
+                    dataset = dataset.shuffle(self.samples, seed=seed, reshuffle_each_iteration=True)
+                decode = decode_image
+
+            num_classes = self.num_classes
+            img_size = self.img_size
+            dataset = dataset.map(
+                lambda source, label: (decode(source, img_size), tf.one_hot(label, num_classes)),
+                num_parallel_calls=autotune, deterministic=not training)
+            if cache:
+                dataset = dataset.cache('' if cache is True else cache)
+            dataset = dataset.batch(self.batch_size)
+
+        if augmentation:
+            dataset = dataset.map(lambda x, y: (augment_batch(tf.cast(x, tf.float32), augmentation), y),
+                                  num_parallel_calls=autotune)
+        if rescale:
+            dataset = dataset.map(lambda x, y: (tf.cast(x, tf.float32) * (1.0 / 255.0), y),
+                                  num_parallel_calls=autotune)
+        elif augmentation:
+            dataset = dataset.map(lambda x, y: (tf.cast(tf.round(x), tf.uint8), y),
+                                  num_parallel_calls=autotune)
+        return dataset.prefetch(autotune)
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from dataset_manifest import load_manifest
+from image_pipeline import load_image
+
+DATASET_CACHE_DIR = 'cache/datasets'
+MANIFEST_FILE = 'manifest.json'
+IMAGES_FILE = 'images.u8'
+LABELS_FILE = 'labels.npy'
+
+
+def list_image_files(data_dir):
+    """(class_names, relative filenames, labels) of a class-folder split, sorted like flow_from_directory"""
+    class_names, filenames, labels = load_manifest(data_dir).split()
+    return class_names, filenames, np.array(labels, dtype=np.int64)
+
+
+def source_fingerprint(data_dir, filenames, img_size=()):
+    """
+    Hash of every source file's path, size, mtime and content hash plus
+    the target size, if any. Adding, removing, replacing or touching any
+    image changes it, and that invalidates the compiled split.
+
+    Every file is stat'ed here: the manifest's incremental refresh does
+    not notice images rewritten in place, and derived caches must.
+    """
+    manifest = load_manifest(data_dir, refresh=False)
+    manifest.refresh_files(filenames)
+    digest = hashlib.sha256(repr(tuple(img_size)).encode())
+    for filename in filenames:
+        record = manifest.files[filename]
+        digest.update(f'{filename}\0{record["size"]}\0{record["mtime_ns"]}\0{record["sha1"]}\n'.encode())
+    return digest.hexdigest()
+
+
+def split_cache_dir(data_dir, cache_root=DATASET_CACHE_DIR, img_size=(224, 224)):
+    """Where a split's compiled arrays live, e.g. cache/datasets/dataset_train_224x224"""
+    name = os.path.normpath(data_dir).strip(os.sep).replace(os.sep, '_').replace(':', '')
+    return os.path.join(cache_root, f'{name}_{img_size[0]}x{img_size[1]}')
+
+
+class CompiledSplit:
+    """
+    One dataset split decoded once into a contiguous (N, H, W, 3) uint8
+    memmap, with its labels and manifest. Reading a batch is a memory
+    copy instead of a JPEG decode.
+    """
+
+    def __init__(self, cache_dir, manifest):
+        self.cache_dir = cache_dir
+        self.manifest = manifest
+        self.class_names = manifest['class_names']
+        self.filenames = manifest['filenames']
+        self.img_size = tuple(manifest['img_size'])
+        self.samples = len(self.filenames)
+        self.images = np.memmap(os.path.join(cache_dir, IMAGES_FILE), dtype=np.uint8, mode='r',
+                                shape=(self.samples, *self.img_size, 3))
+        self.labels = np.load(os.path.join(cache_dir, LABELS_FILE))
+
+
+def _read_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compile_split(data_dir, cache_root=DATASET_CACHE_DIR, img_size=(224, 224), workers=None, force=False):
+    """
+    Decode and resize every image of data_dir once, in parallel, into a
+    memory-mapped uint8 array. Returns the CompiledSplit, reusing the
+    existing one when its manifest still matches the source files.
+
+    Args:
+        data_dir: Class-folder split, e.g. dataset/train
+        cache_root: Directory holding all compiled splits
+        img_size: (height, width) to resize to
+        workers: Decode threads (default: number of CPU cores)
+        force: Rebuild even if the cache is current
+    """
+    cache_dir = split_cache_dir(data_dir, cache_root, img_size)
+    class_names, filenames, labels = list_image_files(data_dir)
+    fingerprint = source_fingerprint(data_dir, filenames, img_size)
+
+    manifest = _read_manifest(cache_dir)
+    if not force and manifest and manifest.get('fingerprint') == fingerprint:
+        return CompiledSplit(cache_dir, manifest)
+
+    print(f"Compiling {data_dir}: {len(filenames)} images -> {cache_dir}")
+    start = time.perf_counter()
+    os.makedirs(cache_dir, exist_ok=True)
+    # A half-written cache must never look valid
+    if os.path.exists(os.path.join(cache_dir, MANIFEST_FILE)):
+        os.remove(os.path.join(cache_dir, MANIFEST_FILE))
+
+    images = np.memmap(os.path.join(cache_dir, IMAGES_FILE), dtype=np.uint8, mode='w+',
+                       shape=(len(filenames), *img_size, 3))
+
+    def decode(index):
+        path = os.path.join(data_dir, filenames[index])
+        images[index] = np.asarray(load_image(path, (img_size[1], img_size[0])), dtype=np.uint8)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        list(executor.map(decode, range(len(filenames))))
+    images.flush()
+    np.save(os.path.join(cache_dir, LABELS_FILE), labels)
+
+    manifest = {
+        'source_dir': data_dir,
+        'class_names': class_names,
+        'filenames': filenames,
+        'img_size': list(img_size),
+        'fingerprint': fingerprint,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    with open(os.path.join(cache_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+
+    print(f"✓ Compiled {len(filenames)} images in {time.perf_counter() - start:.1f}s")
+    return CompiledSplit(cache_dir, manifest)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode dataset splits once into memory-mapped uint8 arrays")
+    parser.add_argument('splits', nargs='*', default=['dataset/train', 'dataset/validation', 'dataset/test'])
+    parser.add_argument('--cache-dir', default=DATASET_CACHE_DIR)
+    parser.add_argument('--img-size', type=int, nargs=2, default=[224, 224], metavar=('HEIGHT', 'WIDTH'))
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help="Rebuild even if the cache is current")
+    args = parser.parse_args()
+
+    for split in args.splits:
+        compiled = compile_split(split, args.cache_dir, tuple(args.img_size), args.workers, args.force)
+        print(f"{split}: {compiled.samples} images, {compiled.images.nbytes / 1e6:.0f} MB at {compiled.cache_dir}")
@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+
+from dataset_manifest import QUARANTINE_PATH, load_manifest
+from leaf_gate import MIN_IMAGE_SIZE
+
+REPORT_PATH = 'analysis_results/dataset_health.json'
+DHASH_SIZE = 8  # 8x8 = 64-bit difference hash
+NEAR_DUPLICATE_DISTANCE = 4  # max differing hash bits for a near duplicate
+
+
+def inspect_image(path):
+    """
+    Fully decode one file. Returns its mode, size, 64-bit difference hash
+    (hex) and the decoding error, if any. Runs in a worker process.
+    """
+    result = {'error': None, 'mode': None, 'width': None, 'height': None, 'dhash': None}
+    try:
+        with Image.open(path) as img:
+            result['mode'] = img.mode
+            result['width'], result['height'] = img.size
+            # JPEGs decode straight to a small greyscale image; truncated data still fails in load()
+            img.draft('L', (DHASH_SIZE * 8, DHASH_SIZE * 8))
+            img.load()
+            gray = img.convert('L').resize((DHASH_SIZE + 1, DHASH_SIZE), Image.BILINEAR)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+        return result
+
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    result['dhash'] = np.packbits(bits).tobytes().hex()
+    return result
+
+
+def near_duplicate_groups(hashes, max_distance=NEAR_DUPLICATE_DISTANCE):
+    """
+    Groups of indices whose hashes differ in at most max_distance bits.
+
+    Hashes are cut into max_distance + 1 bands; two hashes that close must
+    agree exactly on at least one band, so only images sharing a band value
+    are compared instead of every pair.
+    """
+    values = [int(h, 16) for h in hashes]
+    bits = DHASH_SIZE * DHASH_SIZE
+    num_bands = max_distance + 1
+    edges = [bits * k // num_bands for k in range(num_bands + 1)]
+
+    parent = list(range(len(values)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(num_bands):
+        mask = (1 << (edges[band + 1] - edges[band])) - 1
+        buckets = defaultdict(list)
+        for i, value in enumerate(values):
+            buckets[(value >> edges[band]) & mask].append(i)
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    i, j = members[a], members[b]
+                    if find(i) != find(j) and bin(values[i] ^ values[j]).count('1') <= max_distance:
+                        parent[find(i)] = find(j)
+
+    groups = defaultdict(list)
+    for i in range(len(values)):
+        groups[find(i)].append(i)
+    return [g for g in groups.values() if len(g) > 1]
+
+
+def scan_splits(splits, workers=None, max_distance=NEAR_DUPLICATE_DISTANCE):
+    """
+    Decode every image of the splits in parallel processes and collect
+    problems. Returns (report dict, quarantine {absolute path: reason}).
+
+    Quarantined: undecodable files, images under MIN_IMAGE_SIZE pixels,
+    repeated exact copies within a split (the first is kept), and copies
+    in a later split of an exact or near duplicate of an earlier split
+    (splits are ranked in the order given, so train copies are kept and
+    validation/test leakage is dropped). Non-RGB modes are only reported;
+    every loader converts to RGB.
+    """
+    entries = []  # (split rank, path, sha1)
+    absolute = {}  # path -> absolute path, the quarantine list's keys
+    for rank, split in enumerate(splits):
+        manifest = load_manifest(split)
+        root = os.path.realpath(split)
+        for rel_path, record in sorted(manifest.files.items()):
+            path = os.path.normpath(os.path.join(split, rel_path))
+            absolute[path] = os.path.join(root, rel_path)
+            entries.append((rank, path, record['sha1']))
+    paths = [path for _, path, _ in entries]
+
+    print(f"Scanning {len(paths)} images in {len(splits)} splits...")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(inspect_image, paths, chunksize=64))
+    print(f"✓ Decoded in {time.perf_counter() - start:.1f}s")
+
+    quarantine = {}
+    corrupt, non_rgb, too_small = [], [], []
+    for path, result in zip(paths, results):
+        if result['error']:
+            corrupt.append({'path': path, 'error': result['error']})
+            quarantine[path] = 'corrupt'
+            continue
+        if result['mode'] != 'RGB':
+            non_rgb.append({'path': path, 'mode': result['mode']})
+        if min(result['width'], result['height']) < MIN_IMAGE_SIZE:
+            too_small.append({'path': path, 'width': result['width'], 'height': result['height']})
+            quarantine[path] = 'too_small'
+
+    def rank_order(group):
+        return sorted(group, key=lambda i: (entries[i][0], entries[i][1]))
+
+    # Exact duplicates share a content hash
+    by_sha1 = defaultdict(list)
+    for i, (_, _, sha1) in enumerate(entries):
+        by_sha1[sha1].append(i)
+    exact_groups = [rank_order(g) for g in by_sha1.values() if len(g) > 1]
+
+    # Near duplicates: close difference hashes, not all byte-identical
+    decodable = [i for i, r in enumerate(results) if r['dhash']]
+    near_groups = []
+    for group in near_duplicate_groups([results[i]['dhash'] for i in decodable], max_distance):
+        group = rank_order(decodable[k] for k in group)
+        if len({entries[i][2] for i in group}) > 1:
+            near_groups.append(group)
+
+    leakage = []
+    for group, exact in [(g, True) for g in exact_groups] + [(g, False) for g in near_groups]:
+        kept_rank, kept_path = entries[group[0]][0], entries[group[0]][1]
+        if any(entries[i][0] != kept_rank for i in group):
+            leakage.append(group)
+        for i in group[1:]:
+            path = entries[i][1]
+            if entries[i][0] != kept_rank:
+                quarantine.setdefault(path, f'leaks {kept_path}')
+            elif exact:
+                quarantine.setdefault(path, f'duplicate of {kept_path}')
+
+    def as_paths(groups):
+        return [[entries[i][1] for i in g] for g in groups]
+
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'splits': list(splits),
+        'num_images': len(paths),
+        'min_image_size': MIN_IMAGE_SIZE,
+        'near_duplicate_distance': max_distance,
+        'summary': {
+            'corrupt': len(corrupt),
+            'non_rgb': len(non_rgb),
+            'too_small': len(too_small),
+            'exact_duplicate_groups': len(exact_groups),
+            'near_duplicate_groups': len(near_groups),
+            'leaking_groups': len(leakage),
+            'quarantined': len(quarantine)
+        },
+        'corrupt': corrupt,
+        'non_rgb': non_rgb,
+        'too_small': too_small,
+        'exact_duplicates': as_paths(exact_groups),
+        'near_duplicates': as_paths(near_groups),
+        'leakage': as_paths(leakage),
+        'quarantine': quarantine
+    }
+    return report, {absolute[path]: reason for path, reason in quarantine.items()}
+
+
+def save_json(path, data):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def print_summary(report):
+    print("\n" + "=" * 70)
+    print("DATASET HEALTH REPORT")
+    print("=" * 70)
+    print(f"Images scanned:         {report['num_images']}")
+    summary = report['summary']
+    print(f"Corrupt / undecodable:  {summary['corrupt']}")
+    print(f"Non-RGB modes:          {summary['non_rgb']}")
+    print(f"Under {report['min_image_size']}px:            {summary['too_small']}")
+    print(f"Exact duplicate groups: {summary['exact_duplicate_groups']}")
+    print(f"Near duplicate groups:  {summary['near_duplicate_groups']}")
+    print(f"Groups leaking splits:  {summary['leaking_groups']}")
+    print(f"Quarantined:            {summary['quarantined']}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan dataset splits for corrupt, tiny, duplicate and leaking images")
+    parser.add_argument('splits', nargs='*', default=['dataset/train', 'dataset/validation', 'dataset/test'],
+                        help="Splits in priority order; duplicates are kept in the earliest")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--distance', type=int, default=NEAR_DUPLICATE_DISTANCE,
+                        help="Max differing bits of the 64-bit hash for near duplicates")
+    parser.add_argument('--report', default=REPORT_PATH)
+    parser.add_argument('--dry-run', action='store_true', help="Write the report but not the quarantine list")
+    args = parser.parse_args()
+
+    report, quarantine = scan_splits(args.splits, args.workers, args.distance)
+    save_json(args.report, report)
+    print_summary(report)
+    print(f"✓ Report saved to {args.report}")
+    if not args.dry_run:
+        save_json(QUARANTINE_PATH, {'created': report['created'], 'report': args.report, 'files': quarantine})
+        print(f"✓ Quarantine list ({len(quarantine)} files) saved to {QUARANTINE_PATH}; loaders skip these")
@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+MANIFEST_DIR = 'cache/manifests'
+QUARANTINE_PATH = 'cache/quarantine.json'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+MANIFEST_VERSION = 1
+
+# Manifests already loaded by this process, by absolute root
+_loaded = {}
+
+
+def manifest_path(root, manifest_dir=MANIFEST_DIR):
+    """Where the manifest of a directory lives, e.g. cache/manifests/dataset_train.json"""
+    name = os.path.normpath(root).strip(os.sep).replace(os.sep, '_').replace(':', '')
+    return os.path.join(manifest_dir, f'{name}.json')
+
+
+def load_quarantine(path=QUARANTINE_PATH):
+    """{absolute image path: reason} written by dataset_health.py, empty if there is none"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return {os.path.realpath(p): reason for p, reason in json.load(f)['files'].items()}
+
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DatasetManifest:
+    """
+    Persistent index of every image under a directory: relative path,
+    class (first sub-folder), size, mtime, SHA-1 of the contents and
+    image dimensions (None if the header can't be read).
+
+    refresh() re-lists only directories whose mtime changed and re-hashes
+    only files whose size or mtime changed, so an unchanged dataset costs
+    one stat per directory. Files rewritten in place (same directory mtime)
+    are only noticed by refresh(full=True).
+
+    Path and split queries leave out files on the quarantine list;
+    `files` keeps every record.
+    """
+
+    def __init__(self, root, path, data=None):
+        self.root = root
+        self.path = path
+        data = data or {}
+        self.dirs = data.get('dirs', {})
+        self.files = data.get('files', {})
+        self.quarantined = set()
+
+    def apply_quarantine(self, quarantine):
+        """Hide the files of quarantine (absolute paths) that are under this root"""
+        # Resolved once: however root was spelled, the keys are absolute
+        root = os.path.realpath(self.root)
+        self.quarantined = {rel_path for rel_path in self.files
+                            if os.path.join(root, rel_path) in quarantine}
+
+    def _describe(self, rel_path, stat):
+        path = os.path.join(self.root, rel_path)
+        try:
+            with Image.open(path) as img:
+                width, height = img.size
+        except (OSError, ValueError):
+            width = height = None
+        parts = rel_path.split(os.sep)
+        return {
+            'class': parts[0] if len(parts) > 1 else None,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha1': _file_hash(path),
+            'width': width,
+            'height': height
+        }
+
+    def refresh(self, full=False, workers=None):
+        """Bring the manifest up to date. Returns (new or changed files, removed files)"""
+        dirs, files, pending = {}, {}, []
+        stack = ['']
+        while stack:
+            rel_dir = stack.pop()
+            mtime = os.stat(os.path.join(self.root, rel_dir)).st_mtime_ns
+            known = self.dirs.get(rel_dir)
+            if known and known['mtime_ns'] == mtime and not full:
+                dirs[rel_dir] = known
+                for name in known['files']:
+                    rel_path = os.path.join(rel_dir, name)
+                    files[rel_path] = self.files[rel_path]
+            else:
+                subdirs, names = [], []
+                with os.scandir(os.path.join(self.root, rel_dir)) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            subdirs.append(entry.name)
+                        elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                            names.append(entry.name)
+                            rel_path = os.path.join(rel_dir, entry.name)
+                            stat = entry.stat()
+                            old = self.files.get(rel_path)
+                            if old and old['size'] == stat.st_size and old['mtime_ns'] == stat.st_mtime_ns:
+                                files[rel_path] = old
+                            else:
+                                pending.append((rel_path, stat))
+                dirs[rel_dir] = {'mtime_ns': mtime, 'subdirs': sorted(subdirs), 'files': sorted(names)}
+            stack.extend(os.path.join(rel_dir, d) for d in dirs[rel_dir]['subdirs'])
+
+        # Hash and measure new or changed files in parallel
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            described = executor.map(lambda item: self._describe(*item), pending)
+            for (rel_path, _), record in zip(pending, described):
+                files[rel_path] = record
+
+        removed = len(set(self.files) - set(files))
+        changed = bool(pending or removed or dirs != self.dirs)
+        self.dirs, self.files = dirs, files
+        if changed:
+            self.save()
+        return len(pending), removed
+
+    def refresh_files(self, rel_paths, workers=None):
+        """
+        Stat exactly these files and re-describe any whose size or mtime
+        changed, catching in-place rewrites that refresh() skips. Used
+        before deriving caches from the records. Returns the number updated.
+        """
+        pending = []
+        for rel_path in rel_paths:
+            stat = os.stat(os.path.join(self.root, rel_path))
+            old = self.files.get(rel_path)
+            if not old or old['size'] != stat.st_size or old['mtime_ns'] != stat.st_mtime_ns:
+                pending.append((rel_path, stat))
+        if pending:
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+                described = executor.map(lambda item: self._describe(*item), pending)
+                for (rel_path, _), record in zip(pending, described):
+                    self.files[rel_path] = record
+            self.save()
+        return len(pending)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'root': self.root,
+                       'updated': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'dirs': self.dirs, 'files': self.files}, f)
+        # Readers never see a half-written manifest
+        os.replace(temp_path, self.path)
+
+    def _walk(self, rel_dir):
+        """Relative file paths under rel_dir: its files, then each sub-folder's, all sorted"""
+        entry = self.dirs.get(rel_dir)
+        if entry is None:
+            return
+        for name in entry['files']:
+            rel_path = os.path.join(rel_dir, name)
+            if rel_path not in self.quarantined:
+                yield rel_path
+        for subdir in entry['subdirs']:
+            yield from self._walk(os.path.join(rel_dir, subdir))
+
+    def relative_paths(self, subdir=''):
+        """Image paths relative to root, under subdir, in sorted walk order"""
+        return list(self._walk(subdir))
+
+    def image_paths(self, subdir=''):
+        """Image paths (joined with root) under subdir, in sorted walk order"""
+        return [os.path.join(self.root, p) for p in self._walk(subdir)]
+
+    @property
+    def class_names(self):
+        return self.dirs['']['subdirs'] if '' in self.dirs else []
+
+    def split(self):
+        """(class_names, relative filenames, labels) in flow_from_directory's order"""
+        filenames, labels = [], []
+        for label, class_name in enumerate(self.class_names):
+            paths = self.relative_paths(class_name)
+            filenames.extend(paths)
+            labels.extend([label] * len(paths))
+        return self.class_names, filenames, labels
+
+
+def load_manifest(root, refresh=True, full=False, manifest_dir=MANIFEST_DIR):
+    """
+    The manifest of root, refreshed incrementally, with the current
+    quarantine list applied. Loaded from disk once per process; later
+    calls only re-check directory mtimes.
+    """
+    key = os.path.abspath(root)
+    manifest = _loaded.get(key)
+    if manifest is None:
+        path = manifest_path(root, manifest_dir)
+        data = None
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != MANIFEST_VERSION:
+                data = None
+        manifest = _loaded[key] = DatasetManifest(root, path, data)
+    if refresh:
+        added, removed = manifest.refresh(full)
+        if added or removed:
+            print(f"✓ Manifest of {root}: {len(manifest.files)} images "
+                  f"({added} new/changed, {removed} removed)")
+    previous = manifest.quarantined
+    manifest.apply_quarantine(load_quarantine())
+    if manifest.quarantined and manifest.quarantined != previous:
+        print(f"⚠ {len(manifest.quarantined)} quarantined images under {root} are skipped")
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or refresh the image manifests of dataset folders")
+    parser.add_argument('roots', nargs='*', default=['dataset/train', 'dataset/validation', 'dataset/test'])
+    parser.add_argument('--full', action='store_true',
+                        help="Re-stat every file, catching files rewritten in place")
+    args = parser.parse_args()
+
+    for root in args.roots:
+        start = time.perf_counter()
+        manifest = load_manifest(root, full=args.full)
+        print(f"{root}: {len(manifest.files)} images in {len(manifest.class_names)} classes "
+              f"({time.perf_counter() - start:.2f}s) -> {manifest.path}")
@@ -6,45 +6,35 @@ sys.stdout = Logger('project_log.txt')
 
 import os
 import tensorflow as tf
-from tensorflow import keras
 import numpy as np
-from PIL import Image
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.metrics import classification_report, confusion_matrix
 
+from dataset_manifest import load_manifest
+from image_pipeline import load_image
+from inference_backends import load_backend
+from model_metadata import get_class_names
+
 
 class ModelEvaluator:
-    def __init__(self, model_path='models/best_model.h5'):
+    def __init__(self, model_path='models/best_model.h5', backend=None):
         print("Loading model for evaluation...")
-        self.model = keras.models.load_model(model_path)
+        self.predictor = load_backend(model_path, backend)
         self.img_size = (224, 224)
-        self.class_names = self.get_class_names()
+        self.class_names = self.predictor.class_names or get_class_names(model_path)
         print(f"Classes: {self.class_names}")
 
-    def get_class_names(self):
-        """Get class names from training directory"""
-        train_dir = 'dataset/train'
-        if os.path.exists(train_dir):
-            classes = sorted([d for d in os.listdir(train_dir)
-                              if os.path.isdir(os.path.join(train_dir, d))])
-            return classes
-        return []
-
     def evaluate_single_image(self, image_path):
         """Evaluate a single image with detailed analysis"""
         actual_class = os.path.basename(os.path.dirname(image_path))
 
         # Preprocess image
-        img = Image.open(image_path)
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        img = img.resize(self.img_size)
-        img_array = np.array(img) / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
+        img = load_image(image_path, self.img_size)
+        img_array = np.asarray(img, dtype=np.uint8)
 
         # Predict
-        predictions = self.model.predict(img_array)[0]
+        predictions = self.predictor.predict_one(img_array)
         predicted_idx = np.argmax(predictions)
         predicted_class = self.class_names[predicted_idx]
         confidence = predictions[predicted_idx]
@@ -73,18 +63,17 @@ class ModelEvaluator:
         """Evaluate multiple random images from validation set"""
         validation_dir = 'dataset/validation'
         results = []
+        if not os.path.isdir(validation_dir):
+            return results
+        manifest = load_manifest(validation_dir)
 
         for class_name in self.class_names:
-            class_path = os.path.join(validation_dir, class_name)
-            if os.path.exists(class_path):
-                images = [f for f in os.listdir(class_path)
-                          if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-
-                # Test 1-2 images per class
-                for img_name in images[:min(2, len(images))]:
-                    img_path = os.path.join(class_path, img_name)
-                    result, _ = self.evaluate_single_image(img_path)
-                    results.append(result)
+            images = manifest.image_paths(class_name)
+
+            # Test 1-2 images per class
+            for img_path in images[:min(2, len(images))]:
+                result, _ = self.evaluate_single_image(img_path)
+                results.append(result)
 
         return results
 
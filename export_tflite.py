@@ -0,0 +1,148 @@
+import os
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from compiled_predictor import CompiledPredictor
+from dataset_cache import compile_split, list_image_files
+from image_pipeline import load_image
+from model_metadata import get_class_names, load_metadata, save_metadata
+from tflite_predictor import TFLitePredictor
+
+IMG_SIZE = (224, 224)
+
+
+def list_labelled_images(data_dir):
+    """Return (paths, labels) for a class-folder dataset, classes sorted by name"""
+    _, filenames, labels = list_image_files(data_dir)
+    return [os.path.join(data_dir, f) for f in filenames], labels
+
+
+def load_uint8_image(path):
+    return np.asarray(load_image(path, IMG_SIZE), dtype=np.uint8)
+
+
+def make_representative_dataset(paths, num_samples=200, seed=42):
+    """Calibration images drawn at random from the validation set"""
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(paths), size=min(num_samples, len(paths)), replace=False)
+
+    def representative_dataset():
+        for i in sample:
+            image = load_uint8_image(paths[i]).astype(np.float32) / 255.0
+            yield [image[np.newaxis]]
+
+    return representative_dataset
+
+
+def export_float16(model, output_path):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.target_spec.supported_types = [tf.float16]
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    print(f"✓ Float16 model saved to {output_path}")
+
+
+def export_int8(model, output_path, representative_dataset):
+    """Full-integer model with uint8 input, so raw pixels can be fed directly"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.uint8
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+    print(f"✓ Full-int8 model saved to {output_path}")
+
+
+def evaluate_predictor(predictor, images, labels, batch_size=32):
+    """Return (accuracy, probabilities, ms per image)"""
+    probabilities = []
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        probabilities.append(predictor.predict(images[i:i + batch_size]))
+    elapsed = time.perf_counter() - start
+    probabilities = np.concatenate(probabilities)
+    accuracy = float(np.mean(np.argmax(probabilities, axis=1) == labels))
+    return accuracy, probabilities, elapsed / len(images) * 1000
+
+
+def compare_models(model, model_paths, images, labels):
+    """Print accuracy delta, agreement, latency and size against the Keras model"""
+    keras_acc, keras_probs, keras_ms = evaluate_predictor(CompiledPredictor(model), images, labels)
+    keras_pred = np.argmax(keras_probs, axis=1)
+
+    print("\n" + "=" * 80)
+    print("TFLITE EXPORT REPORT")
+    print("=" * 80)
+    print(f"{'Model':35} {'Size (MB)':>10} {'Accuracy':>10} {'Delta':>8} {'Agree':>8} {'ms/img':>8}")
+    print("-" * 80)
+    print(f"{'Keras (' + os.path.basename(model_paths['keras']) + ')':35} "
+          f"{os.path.getsize(model_paths['keras']) / 1e6:10.2f} {keras_acc:10.4f} {'':>8} {'':>8} {keras_ms:8.2f}")
+
+    for name in ('float16', 'int8'):
+        path = model_paths[name]
+        acc, probs, ms = evaluate_predictor(TFLitePredictor(path), images, labels)
+        agreement = float(np.mean(np.argmax(probs, axis=1) == keras_pred))
+        print(f"{'TFLite ' + name:35} {os.path.getsize(path) / 1e6:10.2f} {acc:10.4f} "
+              f"{acc - keras_acc:+8.4f} {agreement:8.4f} {ms:8.2f}")
+    print("=" * 80)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the trained model to float16 and int8 TFLite")
+    parser.add_argument('--model', default='models/best_model.h5')
+    parser.add_argument('--validation-dir', default='dataset/validation')
+    parser.add_argument('--output-dir', default='models')
+    parser.add_argument('--calibration-samples', type=int, default=200)
+    parser.add_argument('--eval-samples', type=int, default=None,
+                        help="Limit the accuracy comparison to this many validation images")
+    parser.add_argument('--dataset-cache', default=None,
+                        help="Read comparison images from this compiled dataset cache root")
+    args = parser.parse_args()
+
+    print("Loading trained model...")
+    model = keras.models.load_model(args.model)
+    paths, labels = list_labelled_images(args.validation_dir)
+    print(f"Validation images: {len(paths)}")
+
+    base_name = os.path.splitext(os.path.basename(args.model))[0]
+    model_paths = {
+        'keras': args.model,
+        'float16': os.path.join(args.output_dir, f'{base_name}_float16.tflite'),
+        'int8': os.path.join(args.output_dir, f'{base_name}_int8.tflite')
+    }
+
+    export_float16(model, model_paths['float16'])
+    export_int8(model, model_paths['int8'],
+                make_representative_dataset(paths, args.calibration_samples))
+
+    # Sidecars give the exports the source model's labels and their own checksums
+    source_metadata = load_metadata(args.model) or {}
+    class_names = get_class_names(args.model)
+    for quantization in ('float16', 'int8'):
+        save_metadata(model_paths[quantization], class_names,
+                      input_size=source_metadata.get('input_size', IMG_SIZE),
+                      source_model=args.model, quantization=quantization)
+    print("✓ Metadata written next to both exports")
+
+    compiled = compile_split(args.validation_dir, args.dataset_cache, IMG_SIZE) if args.dataset_cache else None
+    if compiled:
+        labels = compiled.labels
+    keep = np.arange(len(labels))
+    if args.eval_samples and args.eval_samples < len(labels):
+        keep = np.sort(np.random.default_rng(0).choice(len(labels), args.eval_samples, replace=False))
+    print("\nLoading validation images for comparison...")
+    if compiled:
+        images = np.asarray(compiled.images[keep])
+    else:
+        images = np.stack([load_uint8_image(paths[i]) for i in keep])
+    labels = labels[keep]
+    compare_models(model, model_paths, images, labels)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+from tensorflow import keras
+
+from dataset_cache import source_fingerprint
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def source_identity(data):
+    """
+    Content fingerprint of an ImageFolderDataset's images: the compiled
+    cache's or the shard index's fingerprint when it streams from one
+    (both already cover every file's size, mtime and hash), otherwise the
+    source files' own.
+    """
+    if getattr(data, 'compiled', None):
+        return data.compiled.manifest['fingerprint']
+    if getattr(data, 'shard_dir', None):
+        return data.shard_index['fingerprint']
+    return source_fingerprint(data.data_dir, data.filenames)
+
+
+def data_fingerprint(data, extractor, views, **extra):
+    """
+    Identity of a cached split: the image list with labels and file
+    contents, the backbone, the number of views and anything else passed
+    in (e.g. augmentation settings). A cache whose manifest has a
+    different fingerprint is rebuilt, so images rewritten or relabeled in
+    place never reuse stale features.
+    """
+    digest = hashlib.sha256(source_identity(data).encode())
+    for filename, label in zip(data.filenames, data.classes):
+        digest.update(f'{filename}\0{int(label)}\n'.encode())
+    return {
+        'images': digest.hexdigest(),
+        'num_images': data.samples,
+        'loader': type(data).__name__,
+        'views': views,
+        'backbone': extractor.name,
+        'backbone_params': int(extractor.count_params()),
+        'feature_shape': [int(d) for d in extractor.output_shape[1:]],
+        **extra
+    }
+
+
+def _load_manifest(cache_dir):
+    path = os.path.join(cache_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_manifest(cache_dir, manifest):
+    with open(os.path.join(cache_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def cached_features(extractor, data, cache_dir, split, views=1, **fingerprint_extra):
+    """
+    Backbone features of every image of an ImageFolderDataset, computed once.
+
+    Each of the `views` passes over data.dataset draws fresh random
+    augmentations, so views=K gives K augmented copies of the training set.
+    Features (pooled vectors or whole activation maps) are stored as a
+    float16 memmap (N * views, *feature_shape) plus int labels, and
+    reused while the split's fingerprint is unchanged.
+
+    Returns: (features memmap, labels array)
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    features_path = os.path.join(cache_dir, f'{split}_features.f16')
+    labels_path = os.path.join(cache_dir, f'{split}_labels.npy')
+
+    fingerprint = data_fingerprint(data, extractor, views, **fingerprint_extra)
+    manifest = _load_manifest(cache_dir)
+    shape = (data.samples * views, *fingerprint['feature_shape'])
+
+    if manifest.get(split) == fingerprint and os.path.exists(features_path) and os.path.exists(labels_path):
+        print(f"✓ Reusing cached {split} features {shape} from {cache_dir}")
+        return np.memmap(features_path, dtype=np.float16, mode='r', shape=shape), np.load(labels_path)
+
+    print(f"Extracting {split} features: {data.samples} images x {views} view(s)...")
+    start = time.perf_counter()
+    features = np.memmap(features_path, dtype=np.float16, mode='w+', shape=shape)
+    labels = np.empty(shape[0], dtype=np.int64)
+    row = 0
+    for _ in range(views):
+        for x, y in data.dataset:
+            n = len(x)
+            features[row:row + n] = extractor(x, training=False).numpy()
+            labels[row:row + n] = np.argmax(y, axis=1)
+            row += n
+    features.flush()
+    np.save(labels_path, labels)
+
+    manifest[split] = fingerprint
+    _save_manifest(cache_dir, manifest)
+    print(f"✓ {split} features cached in {time.perf_counter() - start:.1f}s "
+          f"({features.nbytes / 1e6:.1f} MB)")
+    return np.memmap(features_path, dtype=np.float16, mode='r', shape=shape), labels
+
+
+class BestModelCheckpoint(keras.callbacks.Callback):
+    """
+    ModelCheckpoint for training on cached features: the model being fit
+    (a head or split model) shares its layers with `target`, so whenever
+    its monitored metric improves the full `target` model is saved.
+    Like ModelCheckpoint, the best value carries over between fits, and
+    restore() loads the best checkpoint back into `target`.
+    """
+
+    def __init__(self, target, filepath, monitor='val_accuracy', verbose=1):
+        super().__init__()
+        self.target = target
+        self.filepath = filepath
+        self.monitor = monitor
+        self.verbose = verbose
+        self.best = -np.inf
+
+    def on_epoch_end(self, epoch, logs=None):
+        current = (logs or {}).get(self.monitor)
+        if current is None or current <= self.best:
+            return
+        if self.verbose:
+            print(f"\nEpoch {epoch + 1}: {self.monitor} improved from {self.best:.5f} to {current:.5f}, "
+                  f"saving model to {self.filepath}")
+        self.best = current
+        self.target.save(self.filepath)
+
+    def restore(self):
+        """Load the best saved weights into target (no-op if nothing was saved)"""
+        if os.path.exists(self.filepath) and np.isfinite(self.best):
+            self.target.load_weights(self.filepath)
+
+
+class FeatureSequence(keras.utils.Sequence):
+    """Batches of cached features (as float32) and one-hot labels for Model.fit"""
+
+    def __init__(self, features, labels, num_classes, batch_size=32, shuffle=True, seed=42):
+        super().__init__()
+        self.features = features
+        self.labels = labels
+        self.num_classes = num_classes
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+        self.order = np.arange(len(labels))
+        self.on_epoch_end()
+
+    def __len__(self):
+        return int(np.ceil(len(self.labels) / self.batch_size))
+
+    def __getitem__(self, index):
+        # Sorted indices keep memmap reads close to sequential within a batch
+        batch = np.sort(self.order[index * self.batch_size:(index + 1) * self.batch_size])
+        x = np.asarray(self.features[batch], dtype=np.float32)
+        y = np.eye(self.num_classes, dtype=np.float32)[self.labels[batch]]
+        return x, y
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self.rng.shuffle(self.order)
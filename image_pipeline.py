@@ -0,0 +1,116 @@
+from functools import cached_property
+import numpy as np
+from PIL import Image
+
+from leaf_gate import leaf_stats
+
+MODEL_INPUT_SIZE = (224, 224)
+THUMBNAIL_SIZE = (64, 64)
+
+# One resampling filter for every resize to the model input, everywhere
+RESAMPLE = Image.BICUBIC
+
+
+def open_image(source, target_size=MODEL_INPUT_SIZE):
+    """
+    Open an image, decoding JPEGs at reduced resolution when possible.
+
+    Image.draft lets libjpeg apply DCT scaling (1/2, 1/4 or 1/8) during
+    decode, picking the smallest scale that still covers target_size. A
+    4000x3000 phone photo headed for 224x224 is decoded at 500x375
+    instead of full size. PIL images passed in are returned untouched, so
+    a caller's image is never shrunk behind its back.
+    """
+    if isinstance(source, Image.Image):
+        return source
+    image = Image.open(source)
+    _draft(image, target_size)
+    return image
+
+
+def _draft(image, target_size):
+    if image.format == 'JPEG':
+        image.draft('RGB', target_size)
+
+
+def load_image(source, target_size=MODEL_INPUT_SIZE):
+    """Open, reduced-resolution decode, convert to RGB and resize to target_size"""
+    image = open_image(source, target_size)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return image.resize(target_size, RESAMPLE)
+
+
+class ImagePipeline:
+    """
+    Decode an uploaded image once and share everything derived from it.
+
+    Validation, display and inference each used to convert the upload to
+    a full-resolution RGB array on their own. Here the image is decoded
+    and converted to RGB once, and every product is computed lazily and
+    kept:
+
+    - size / mode / format: read from the header, no decode
+    - rgb: the decoded RGB image
+    - thumbnail / thumbnail_array: small copy for colour and quality checks
+    - leaf_stats: colour statistics of the thumbnail for the leaf gate
+    - model_input: 224x224 uint8 array for the predictor
+    - array_at(size): the same at any other model size, e.g. the leaf gate's
+    """
+
+    def __init__(self, source, model_input_size=MODEL_INPUT_SIZE, thumbnail_size=THUMBNAIL_SIZE):
+        """
+        Args:
+            source: File path, file-like object (e.g. a Streamlit upload) or PIL image
+            model_input_size: (width, height) of the model input
+            thumbnail_size: Bounding box of the validation thumbnail
+        """
+        owned = not isinstance(source, Image.Image)
+        self.image = Image.open(source) if owned else source
+        self.model_input_size = model_input_size
+        self.thumbnail_size = thumbnail_size
+        self._arrays = {}
+
+        # Header fields of the original upload, available without decoding pixels
+        self.size = self.image.size
+        self.mode = self.image.mode
+        self.format = self.image.format
+
+        # Nothing downstream needs more than the model input size, so let
+        # libjpeg decode large JPEGs directly at a reduced DCT scale. Only
+        # for images opened here; a caller's PIL image is left as it is.
+        if owned:
+            _draft(self.image, model_input_size)
+
+    @cached_property
+    def rgb(self):
+        """Decoded RGB image (the only conversion, at reduced JPEG scale)"""
+        return self.image if self.image.mode == 'RGB' else self.image.convert('RGB')
+
+    @cached_property
+    def thumbnail(self):
+        """Aspect-preserving RGB thumbnail; box-filtered so colour means are preserved"""
+        width, height = self.rgb.size
+        scale = min(self.thumbnail_size[0] / width, self.thumbnail_size[1] / height, 1.0)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return self.rgb.resize(size, Image.BOX)
+
+    @cached_property
+    def thumbnail_array(self):
+        return np.asarray(self.thumbnail)
+
+    @cached_property
+    def leaf_stats(self):
+        """Green/skin ratios, brightness and average colour, computed once"""
+        return leaf_stats(self.thumbnail_array)
+
+    def array_at(self, size):
+        """(H, W, 3) uint8 array resized to (width, height), kept per size"""
+        if size not in self._arrays:
+            self._arrays[size] = np.asarray(self.rgb.resize(size, RESAMPLE), dtype=np.uint8)
+        return self._arrays[size]
+
+    @property
+    def model_input(self):
+        """(H, W, 3) uint8 array at the model's input size"""
+        return self.array_at(tuple(self.model_input_size))
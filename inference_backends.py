@@ -0,0 +1,226 @@
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+
+from compiled_predictor import CompiledPredictor
+from model_metadata import load_metadata
+from specialist_heads import load_specialists, specialists_path
+from tflite_predictor import TFLitePredictor
+
+
+class InferenceBackend:
+    """
+    Common contract for every model runtime.
+
+    predict() takes a uint8 (N, H, W, 3) batch of raw pixels and returns an
+    (N, num_classes) float array of probabilities. Any rescaling the model
+    needs is the backend's job, so callers never depend on the runtime.
+    """
+
+    name = 'base'
+    class_names = None
+    metadata = None
+
+    def predict(self, batch):
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Run one throwaway forward pass so the first real request pays no setup cost"""
+        self.predict(np.zeros((1, *self.input_shape), dtype=np.uint8))
+
+    def predict_one(self, image):
+        """Return class probabilities for a single uint8 (H, W, 3) image"""
+        return self.predict(np.expand_dims(image, axis=0))[0]
+
+    def input_buffer(self, n):
+        """uint8 buffer for n images; backends may hand out a reusable one"""
+        return np.empty((n, *self.input_shape), dtype=np.uint8)
+
+
+class KerasBackend(InferenceBackend):
+    """Keras .h5/.keras model run through the bucketed CompiledPredictor"""
+
+    name = 'keras'
+
+    def __init__(self, model_path):
+        self.model = keras.models.load_model(model_path)
+        self.predictor = CompiledPredictor(self.model)
+        self.input_shape = self.predictor.input_shape
+        self.num_classes = self.predictor.num_classes
+
+    def predict(self, batch):
+        return self.predictor.predict(batch)
+
+    def input_buffer(self, n):
+        if n <= self.predictor.buckets[-1]:
+            return self.predictor.input_buffer(n)
+        return super().input_buffer(n)
+
+
+class SpecialistBackend(KerasBackend):
+    """
+    Keras model plus binary heads for its most confused class pairs.
+
+    A single traced graph returns the probabilities and the features that
+    feed the model's final layer, so a specialist head (trained by
+    specialist_heads.py) reuses the backbone pass instead of running
+    another network. Heads only touch rows whose top-2 classes are their
+    pair; without a heads file this behaves like KerasBackend.
+    """
+
+    name = 'specialists'
+
+    def __init__(self, model_path):
+        self.model = keras.models.load_model(model_path)
+        features = self.model.layers[-1].input
+        combined = keras.Model(self.model.inputs,
+                               keras.layers.Concatenate()([self.model.output, features]))
+        self.predictor = CompiledPredictor(combined)
+        self.input_shape = self.predictor.input_shape
+        self.num_classes = self.model.output_shape[-1]
+        self.heads = load_specialists(specialists_path(model_path), self.num_classes)
+        self.images = 0
+        self.refined = 0
+
+    def predict_with_features(self, batch):
+        """(probabilities, final-layer input features) for a uint8 batch"""
+        outputs = self.predictor.predict(batch)
+        return outputs[:, :self.num_classes], outputs[:, self.num_classes:]
+
+    def predict(self, batch):
+        probabilities, features = self.predict_with_features(batch)
+        self.images += len(probabilities)
+        if self.heads is None:
+            return probabilities
+        probabilities, refined = self.heads.refine(probabilities, features)
+        self.refined += refined
+        return probabilities
+
+
+class SavedModelBackend(InferenceBackend):
+    """TensorFlow SavedModel directory, called through one of its signatures"""
+
+    name = 'savedmodel'
+
+    def __init__(self, model_path, signature='serving_default'):
+        self.loaded = tf.saved_model.load(model_path)
+        self.signature = self.loaded.signatures[signature]
+        input_specs = self.signature.structured_input_signature[1]
+        self.input_key, input_spec = next(iter(input_specs.items()))
+        self.input_dtype = input_spec.dtype
+        self.input_shape = tuple(input_spec.shape[1:])
+        self.num_classes = int(next(iter(self.signature.structured_outputs.values())).shape[-1])
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.uint8)
+        if self.input_dtype == tf.uint8:
+            inputs = tf.constant(batch)
+        else:
+            inputs = tf.cast(batch, self.input_dtype) * (1.0 / 255.0)
+        outputs = self.signature(**{self.input_key: inputs})
+        return next(iter(outputs.values())).numpy()
+
+
+class TFLiteBackend(InferenceBackend):
+    """TFLite flatbuffer (float, float16 or full-int8) run by the TFLite interpreter"""
+
+    name = 'tflite'
+
+    def __init__(self, model_path):
+        self.predictor = TFLitePredictor(model_path)
+        self.input_shape = self.predictor.input_shape
+        self.num_classes = self.predictor.num_classes
+
+    def predict(self, batch):
+        return self.predictor.predict(batch)
+
+
+class ONNXRuntimeBackend(InferenceBackend):
+    """ONNX model run by ONNX Runtime on CPU (requires the onnxruntime package)"""
+
+    name = 'onnx'
+
+    def __init__(self, model_path):
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_is_uint8 = model_input.type == 'tensor(uint8)'
+        self.input_shape = tuple(model_input.shape[1:])
+        self.num_classes = self.session.get_outputs()[0].shape[-1]
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.uint8)
+        if not self.input_is_uint8:
+            batch = batch.astype(np.float32) * (1.0 / 255.0)
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+BACKENDS = {
+    KerasBackend.name: KerasBackend,
+    SpecialistBackend.name: SpecialistBackend,
+    SavedModelBackend.name: SavedModelBackend,
+    TFLiteBackend.name: TFLiteBackend,
+    ONNXRuntimeBackend.name: ONNXRuntimeBackend
+}
+
+EXTENSION_BACKENDS = {
+    '.h5': KerasBackend.name,
+    '.keras': KerasBackend.name,
+    '.tflite': TFLiteBackend.name,
+    '.onnx': ONNXRuntimeBackend.name
+}
+
+
+def detect_backend(model_path):
+    """Pick a backend name from the artifact's file extension or layout"""
+    if os.path.isdir(model_path) and os.path.exists(os.path.join(model_path, 'saved_model.pb')):
+        return SavedModelBackend.name
+    extension = os.path.splitext(model_path)[1].lower()
+    if extension not in EXTENSION_BACKENDS:
+        raise ValueError(f"Cannot infer an inference backend for '{model_path}'")
+    return EXTENSION_BACKENDS[extension]
+
+
+def load_backend(model_path, backend=None, warm_up=True):
+    """
+    Load a model artifact behind the InferenceBackend contract.
+
+    Args:
+        model_path: .h5/.keras, .tflite, .onnx file or SavedModel directory
+            (including bundles written by model_bundle.py)
+        backend: Backend name to force ('keras', 'specialists', 'savedmodel',
+            'tflite', 'onnx'); defaults to the PLANT_MODEL_BACKEND environment
+            variable, then to detection from the path
+        warm_up: Run a throwaway forward pass before returning
+
+    The returned backend carries the artifact's `metadata` and
+    `class_names` (None if it has no metadata) and a `timings` dict with
+    load, warm-up and total time-to-first-prediction in seconds.
+    """
+    backend = backend or os.environ.get('PLANT_MODEL_BACKEND') or detect_backend(model_path)
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}'. Choose from: {sorted(BACKENDS)}")
+
+    start = time.perf_counter()
+    instance = BACKENDS[backend](model_path)
+    instance.metadata = load_metadata(model_path)
+    if instance.metadata:
+        instance.class_names = instance.metadata['class_names']
+    loaded = time.perf_counter()
+    if warm_up:
+        instance.warm_up()
+    ready = time.perf_counter()
+
+    instance.timings = {
+        'load_s': loaded - start,
+        'warmup_s': ready - loaded,
+        'time_to_first_prediction_s': ready - start
+    }
+    print(f"Model ready ({backend}): load {instance.timings['load_s']:.2f}s + "
+          f"warm-up {instance.timings['warmup_s']:.2f}s = "
+          f"{instance.timings['time_to_first_prediction_s']:.2f}s to first prediction")
+    return instance
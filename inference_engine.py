@@ -0,0 +1,155 @@
+import time
+import queue
+import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+
+_STOP = object()
+
+
+class MicroBatchInferenceEngine:
+    """
+    Merge concurrent single-image requests into batched forward passes.
+
+    Callers submit one preprocessed image at a time and get a Future back.
+    A background worker collects requests until either max_batch_size is
+    reached or max_wait_ms has passed since the first request of the
+    batch arrived, runs predict_fn once on the stacked batch and hands
+    each caller its own row of the output.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5.0):
+        """
+        Args:
+            predict_fn: Callable taking a stacked (N, H, W, 3) batch and
+                returning an (N, num_classes) array of probabilities
+            max_batch_size: Largest batch handed to predict_fn
+            max_wait_ms: How long the first request of a batch may wait
+                for others to join it
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.requests = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='micro-batch-inference', daemon=True)
+        self._worker.start()
+
+    def submit(self, image_array):
+        """Queue one preprocessed image; returns a Future of its probabilities"""
+        future = Future()
+        self._queue.put((np.asarray(image_array), future))
+        return future
+
+    def predict(self, image_array, timeout=None):
+        """Blocking convenience wrapper around submit()"""
+        return self.submit(image_array).result(timeout=timeout)
+
+    def close(self):
+        """Stop the worker once already queued requests are served"""
+        self._queue.put(_STOP)
+        self._worker.join()
+
+    def get_stats(self):
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'avg_batch_size': self.requests / self.batches if self.batches else 0.0
+        }
+
+    def _collect_batch(self, first):
+        """Gather requests until the batch is full or the wait budget runs out"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = self._collect_batch(item)
+            futures = [future for _, future in batch]
+            try:
+                probabilities = np.asarray(self.predict_fn(np.stack([array for array, _ in batch])))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            self.requests += len(batch)
+            self.batches += 1
+            for future, probs in zip(futures, probabilities):
+                future.set_result(probs)
+
+
+def run_benchmark(model_path='models/best_model.h5', clients=16, requests_per_client=20,
+                  max_batch_size=32, max_wait_ms=5.0):
+    """Compare per-request model.predict against the micro-batching engine"""
+    from tensorflow import keras
+
+    model = keras.models.load_model(model_path)
+    rng = np.random.default_rng(0)
+    images = rng.random((clients * requests_per_client, 224, 224, 3), dtype=np.float32)
+
+    def run_clients(predict_one):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(predict_one, images))
+        return len(images) / (time.perf_counter() - start)
+
+    # Warm up both paths so tracing is not part of the measurement
+    model.predict(images[:1], verbose=0)
+    model.predict_on_batch(images[:max_batch_size])
+
+    lock = threading.Lock()
+
+    def per_request(image):
+        # Keras models are not safe to call from many threads at once
+        with lock:
+            return model.predict(image[np.newaxis], verbose=0)[0]
+
+    baseline = run_clients(per_request)
+
+    engine = MicroBatchInferenceEngine(model.predict_on_batch, max_batch_size=max_batch_size,
+                                       max_wait_ms=max_wait_ms)
+    batched = run_clients(engine.predict)
+    stats = engine.get_stats()
+    engine.close()
+
+    print("\n" + "=" * 60)
+    print("MICRO-BATCHING BENCHMARK")
+    print("=" * 60)
+    print(f"Concurrent clients: {clients} x {requests_per_client} requests")
+    print(f"Per-request model.predict: {baseline:.1f} images/sec")
+    print(f"Micro-batching engine:     {batched:.1f} images/sec")
+    print(f"Average batch size:        {stats['avg_batch_size']:.1f}")
+    print(f"Speedup:                   {batched / baseline:.2f}x")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the micro-batching inference engine")
+    parser.add_argument('--model', default='models/best_model.h5')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=20)
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    run_benchmark(args.model, args.clients, args.requests, args.max_batch_size, args.max_wait_ms)
@@ -0,0 +1,230 @@
+import os
+import time
+import argparse
+import numpy as np
+
+from inference_engine import MicroBatchInferenceEngine
+
+# Minimum side of the original upload, in pixels
+MIN_IMAGE_SIZE = 50
+
+# Learned first-stage gate written by train_leaf_gate.py
+GATE_MODEL_PATH = 'models/leaf_gate.h5'
+GATE_CLASS_NAMES = ['not_leaf', 'leaf']
+GATE_INPUT_SIZE = (64, 64)
+
+
+def leaf_stats(pixels):
+    """
+    Colour statistics used to gate uploads, in one vectorized pass.
+
+    Works on a small uint8 RGB array (the pipeline's thumbnail) using
+    integer arithmetic only. The HSV windows of the old tf.image check
+    reduce to channel comparisons:
+
+    - green hue [57.6, 180] deg: G is the max channel, or R is and
+      25 * (G - B) >= 24 * delta
+    - green saturation > 0.2: 5 * delta > max
+    - skin hue [0, 36] deg: R >= G >= B and 5 * (G - B) <= 3 * delta
+    - skin saturation (0.15, 0.7): 20 * delta > 3 * max and 10 * delta < 7 * max
+
+    where delta = max - min. Unlike float HSV this has no rounding at the
+    thresholds.
+
+    Returns a dict with green_ratio, skin_ratio, brightness and avg_rgb.
+    """
+    rgb = np.asarray(pixels, dtype=np.int16).reshape(-1, 3)
+    red, green, blue = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    max_c = rgb.max(axis=1)
+    delta = max_c - rgb.min(axis=1)
+
+    is_green = (((green == max_c) | ((red == max_c) & (25 * (green - blue) >= 24 * delta)))
+                & (5 * delta > max_c))
+    is_skin = ((red >= green) & (green >= blue)
+               & (5 * (green - blue) <= 3 * delta)
+               & (20 * delta > 3 * max_c) & (10 * delta < 7 * max_c))
+
+    avg_rgb = rgb.mean(axis=0)
+    return {
+        'green_ratio': float(is_green.mean()),
+        'skin_ratio': float(is_skin.mean()),
+        'brightness': float(avg_rgb.mean()),
+        'avg_rgb': avg_rgb
+    }
+
+
+def is_valid_leaf_image(pipeline):
+    """
+    Simple and aggressive check for leaf images (app.py)
+    Returns: (is_valid, reason)
+    """
+    width, height = pipeline.size
+    if width < MIN_IMAGE_SIZE or height < MIN_IMAGE_SIZE:
+        return False, "Image is too small. Please upload a larger image."
+
+    stats = pipeline.leaf_stats
+    red, green, blue = stats['avg_rgb']
+
+    # Leaves MUST have dominant green channel OR be brownish (dried leaves)
+    is_greenish = (green > red * 1.1 and green > blue * 1.1)
+    is_dried_brown = (red > 100 and green > 80 and abs(red - green) < 30 and blue < green)
+
+    if not (is_greenish or is_dried_brown):
+        return False, "NOT A LEAF - No green plant color detected. This app ONLY works with plant leaves!"
+
+    if stats['brightness'] < 30:
+        return False, "Image is too dark."
+    if stats['brightness'] > 240:
+        return False, "Image is too bright."
+
+    return True, "Valid"
+
+
+def check_if_plant_image(pipeline):
+    """
+    Check if the image likely contains a plant/leaf (app_chatbot.py)
+    Returns: (is_plant, reason)
+    """
+    stats = pipeline.leaf_stats
+
+    if stats['skin_ratio'] > 0.15:  # More than 15% skin tones
+        return False, "This appears to be a photo of a person, not a plant. Please upload a clear image of a plant leaf."
+
+    if stats['green_ratio'] < 0.10:  # Less than 10% green
+        return False, "This image doesn't appear to contain a plant. Please upload a clear leaf image with visible green color."
+
+    return True, "Image validation passed"
+
+
+class LeafGate:
+    """
+    First stage ahead of the main classifier: is this upload a leaf at all?
+
+    With a gate model (a ~30k-parameter CNN on a 64x64 input, see
+    train_leaf_gate.py) the decision is learned; without one it falls
+    back to a colour heuristic, so apps work before the gate is trained.
+    check() has the same (ok, reason) contract as the heuristics.
+
+    The gate is shared by every app session, but backends reuse their
+    input buffers (or interpreter), so all gate requests go through one
+    micro-batching engine that serializes them onto a single worker.
+    """
+
+    def __init__(self, backend=None, fallback=is_valid_leaf_image, threshold=0.5):
+        """
+        Args:
+            backend: InferenceBackend for the gate model, or None
+            fallback: Heuristic check used when there is no gate model
+            threshold: Minimum leaf probability to accept an upload
+        """
+        self.backend = backend
+        self.fallback = fallback
+        self.threshold = threshold
+        if backend is not None:
+            class_names = backend.class_names or GATE_CLASS_NAMES
+            self.leaf_index = class_names.index('leaf')
+            self.input_size = (backend.input_shape[1], backend.input_shape[0])
+            self.engine = MicroBatchInferenceEngine(backend.predict, max_batch_size=32, max_wait_ms=2.0)
+
+    @property
+    def learned(self):
+        return self.backend is not None
+
+    def leaf_probability(self, pipeline):
+        return float(self.engine.predict(pipeline.array_at(self.input_size))[self.leaf_index])
+
+    def check(self, pipeline):
+        """
+        Returns: (is_leaf, reason)
+        """
+        if not self.learned:
+            return self.fallback(pipeline)
+
+        width, height = pipeline.size
+        if width < MIN_IMAGE_SIZE or height < MIN_IMAGE_SIZE:
+            return False, "Image is too small. Please upload a larger image."
+
+        leaf_prob = self.leaf_probability(pipeline)
+        if leaf_prob < self.threshold:
+            return False, (f"NOT A LEAF - the leaf detector is {1 - leaf_prob:.0%} sure this is not a plant leaf. "
+                           f"This app ONLY works with plant leaves!")
+        return True, "Valid"
+
+
+def load_leaf_gate(model_path=GATE_MODEL_PATH, fallback=is_valid_leaf_image, threshold=0.5):
+    """LeafGate for model_path, or a heuristic-only gate if no gate model has been trained"""
+    if not os.path.exists(model_path):
+        print(f"⚠ No leaf gate model at {model_path}; using the colour heuristic")
+        return LeafGate(None, fallback, threshold)
+
+    from inference_backends import detect_backend, load_backend
+
+    # Detect from the path so PLANT_MODEL_BACKEND (meant for the main model) is not applied
+    return LeafGate(load_backend(model_path, detect_backend(model_path)), fallback, threshold)
+
+
+def _reference_decisions(path):
+    """The previous full-resolution checks: tf.image HSV ratios and full-image means"""
+    import tensorflow as tf
+    from PIL import Image
+
+    img_array = np.array(Image.open(path).convert('RGB'))
+    hsv_img = tf.image.rgb_to_hsv(img_array / 255.0).numpy()
+    hue, sat = hsv_img[:, :, 0], hsv_img[:, :, 1]
+    green_ratio = np.mean((hue >= 0.16) & (hue <= 0.5) & (sat > 0.2))
+    skin_ratio = np.mean((hue >= 0.0) & (hue <= 0.1) & (sat > 0.15) & (sat < 0.7))
+    is_plant = not (skin_ratio > 0.15 or green_ratio < 0.10)
+
+    height, width = img_array.shape[:2]
+    red, green, blue = img_array.mean(axis=(0, 1))
+    brightness = img_array.mean()
+    is_leaf = (width >= MIN_IMAGE_SIZE and height >= MIN_IMAGE_SIZE
+               and ((green > red * 1.1 and green > blue * 1.1)
+                    or (red > 100 and green > 80 and abs(red - green) < 30 and blue < green))
+               and 30 <= brightness <= 240)
+    return is_plant, is_leaf
+
+
+def run_benchmark(image_dir, num_images=200, seed=42):
+    """Compare decisions and latency of the full-resolution checks and the thumbnail gate"""
+    from dataset_manifest import load_manifest
+    from image_pipeline import ImagePipeline
+
+    paths = load_manifest(image_dir).image_paths()
+    rng = np.random.default_rng(seed)
+    paths = sorted(rng.choice(paths, size=min(num_images, len(paths)), replace=False))
+
+    _reference_decisions(paths[0])  # exclude TF start-up from the timing
+
+    start = time.perf_counter()
+    reference = [_reference_decisions(p) for p in paths]
+    reference_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    gated = []
+    for path in paths:
+        pipeline = ImagePipeline(path)
+        gated.append((check_if_plant_image(pipeline)[0], is_valid_leaf_image(pipeline)[0]))
+    gate_time = time.perf_counter() - start
+
+    plant_agree = np.mean([r[0] == g[0] for r, g in zip(reference, gated)])
+    leaf_agree = np.mean([r[1] == g[1] for r, g in zip(reference, gated)])
+
+    print("\n" + "=" * 60)
+    print(f"LEAF GATE BENCHMARK ({len(paths)} images)")
+    print("=" * 60)
+    print(f"Full-resolution checks: {reference_time / len(paths) * 1000:.2f} ms/img")
+    print(f"Thumbnail gate:         {gate_time / len(paths) * 1000:.2f} ms/img")
+    print(f"Speedup:                {reference_time / gate_time:.1f}x")
+    print(f"Plant check agreement:  {plant_agree * 100:.1f}%")
+    print(f"Leaf check agreement:   {leaf_agree * 100:.1f}%")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the thumbnail leaf gate against the full-resolution checks")
+    parser.add_argument('--image-dir', default='dataset/validation')
+    parser.add_argument('--num-images', type=int, default=200)
+    args = parser.parse_args()
+
+    run_benchmark(args.image_dir, args.num_images)
@@ -0,0 +1,74 @@
+import os
+import time
+import argparse
+import tensorflow as tf
+from tensorflow import keras
+
+from model_metadata import get_class_names, load_metadata, save_metadata
+
+
+class _ServingModule(tf.Module):
+    """Wraps the Keras model in a uint8 serving signature with in-graph rescaling"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        input_shape = tuple(model.input_shape[1:])
+
+        @tf.function(input_signature=[tf.TensorSpec((None, *input_shape), tf.uint8, name='images')])
+        def serve(images):
+            images = tf.cast(images, tf.float32) * (1.0 / 255.0)
+            return {'probabilities': self.model(images, training=False)}
+
+        self.serve = serve
+
+
+def export_bundle(model_path, bundle_dir, class_names=None):
+    """
+    Export a Keras model as a deployment bundle.
+
+    The bundle is a SavedModel directory whose serving_default signature
+    takes raw uint8 images, plus a model_metadata.json with the label list
+    and preprocessing spec. Loading it skips Keras' JSON config rebuild
+    and weight deserialization, and the signature is already traced.
+    Labels and version default to the source model's own metadata.
+    """
+    model = keras.models.load_model(model_path)
+    module = _ServingModule(model)
+    tf.saved_model.save(module, bundle_dir, signatures={'serving_default': module.serve})
+
+    source_metadata = load_metadata(model_path) or {}
+    metadata = save_metadata(
+        bundle_dir,
+        class_names or get_class_names(model_path),
+        input_size=model.input_shape[1:3],
+        model_version=source_metadata.get('model_version'),
+        source_model=os.path.basename(model_path)
+    )
+    print(f"✓ Model bundle saved to {bundle_dir}")
+    return metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a fast-loading SavedModel deployment bundle")
+    parser.add_argument('--model', default='models/best_model.h5')
+    parser.add_argument('--output', default='models/best_model_bundle')
+    args = parser.parse_args()
+
+    export_bundle(args.model, args.output)
+
+    # Compare cold start of the two formats
+    from inference_backends import load_backend
+
+    print("\n" + "=" * 60)
+    print("COLD START COMPARISON")
+    print("=" * 60)
+    for path in (args.model, args.output):
+        start = time.perf_counter()
+        load_backend(path)
+        print(f"{path}: ready in {time.perf_counter() - start:.2f}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+
+METADATA_FILE = 'model_metadata.json'
+METADATA_SUFFIX = '.meta.json'
+
+DEFAULT_INPUT_SIZE = (224, 224)
+DEFAULT_NORMALIZATION = 'rescale_1_255'
+
+
+def metadata_path(model_path):
+    """
+    Where a model artifact's metadata lives.
+
+    Directory artifacts (SavedModel bundles) keep it inside the directory;
+    single-file artifacts (.h5, .tflite, .onnx) get a sidecar next to the
+    file, e.g. models/best_model.h5 -> models/best_model.h5.meta.json.
+    """
+    if os.path.isdir(model_path):
+        return os.path.join(model_path, METADATA_FILE)
+    return model_path + METADATA_SUFFIX
+
+
+def compute_checksum(model_path):
+    """SHA-256 of a model file, or of every file in a model directory"""
+    digest = hashlib.sha256()
+    if os.path.isdir(model_path):
+        files = []
+        for dirpath, dirnames, filenames in os.walk(model_path):
+            dirnames.sort()
+            files.extend(os.path.join(dirpath, f) for f in sorted(filenames) if f != METADATA_FILE)
+    else:
+        files = [model_path]
+
+    for path in files:
+        digest.update(os.path.relpath(path, model_path).encode())
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_metadata(model_path, class_names, input_size=DEFAULT_INPUT_SIZE,
+                  normalization=DEFAULT_NORMALIZATION, model_version=None, **extra):
+    """
+    Write the metadata for a saved model artifact.
+
+    Args:
+        model_path: The saved artifact (file or SavedModel directory)
+        class_names: Labels in the order of the model's output units
+        input_size: (height, width) the model expects
+        normalization: How uint8 pixels are mapped to model inputs
+        model_version: Free-form version string (defaults to a timestamp)
+        **extra: Any additional fields to record
+    """
+    metadata = {
+        'class_names': list(class_names),
+        'num_classes': len(class_names),
+        'input_size': list(input_size),
+        'input_dtype': 'uint8',
+        'normalization': normalization,
+        'model_version': model_version or time.strftime('%Y%m%d-%H%M%S'),
+        'checksum': compute_checksum(model_path),
+        **extra
+    }
+    with open(metadata_path(model_path), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2)
+    return metadata
+
+
+def load_metadata(model_path):
+    """Read a model's metadata, or None if it was saved without any"""
+    path = metadata_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def verify_checksum(model_path, metadata=None):
+    """True if the artifact still matches the checksum recorded in its metadata"""
+    metadata = metadata or load_metadata(model_path)
+    return bool(metadata) and metadata.get('checksum') == compute_checksum(model_path)
+
+
+def scan_class_names(train_dir):
+    """Legacy label discovery: sorted class folders of the training set"""
+    return sorted(d for d in os.listdir(train_dir)
+                  if os.path.isdir(os.path.join(train_dir, d)))
+
+
+def get_class_names(model_path, fallback_dir='dataset/train'):
+    """
+    Class labels for a model, from its metadata.
+
+    Models saved before metadata existed fall back to scanning
+    fallback_dir; write their metadata once with
+    `python model_metadata.py <model>` to drop that dependency.
+    """
+    metadata = load_metadata(model_path)
+    if metadata:
+        return metadata['class_names']
+
+    if fallback_dir and os.path.isdir(fallback_dir):
+        print(f"⚠ No metadata for {model_path}; reading class names from {fallback_dir}")
+        return scan_class_names(fallback_dir)
+
+    raise FileNotFoundError(f"No metadata found for {model_path} (expected {metadata_path(model_path)})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write metadata for an existing model artifact")
+    parser.add_argument('model', help="Model file or SavedModel directory")
+    parser.add_argument('--train-dir', default='dataset/train',
+                        help="Class-folder directory the model was trained on")
+    parser.add_argument('--version', default=None)
+    args = parser.parse_args()
+
+    metadata = save_metadata(args.model, scan_class_names(args.train_dir), model_version=args.version)
+    print(f"✓ Metadata saved to {metadata_path(args.model)} ({metadata['num_classes']} classes)")
@@ -1,67 +1,261 @@
 import os
+import csv
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import tensorflow as tf
-from tensorflow import keras
 import numpy as np
 from PIL import Image
 
+from cascade_predictor import DEFAULT_THRESHOLD, load_predictor
+from dataset_manifest import IMAGE_EXTENSIONS
+from image_pipeline import load_image
+from model_metadata import get_class_names
+
 
 class MedicinalPlantPredictor:
-    def __init__(self, model_path='models/best_model.h5'):
+    def __init__(self, model_path='models/best_model.h5', backend=None,
+                 fast_model_path=None, threshold=DEFAULT_THRESHOLD):
         print("Loading trained model...")
-        self.model = keras.models.load_model(model_path)
+        # With a fast model, images it is sure about never reach the main model
+        self.predictor = load_predictor(model_path, fast_model_path, threshold, backend)
+        self.model = getattr(self.predictor, 'model', None)
         self.img_size = (224, 224)
 
-        # Let's discover the actual class names from your model training
-        self.class_names = self.get_actual_class_names()
+        # Labels come from the model's metadata rather than a dataset scan
+        self.class_names = self.predictor.class_names or get_class_names(model_path)
         print(f"Model loaded! Actual classes: {self.class_names}")
 
-    def get_actual_class_names(self):
-        """Get the actual class names used during training"""
-        # Check if we can find class names from the dataset
-        train_dir = 'dataset/train'
-        if os.path.exists(train_dir):
-            classes = sorted([d for d in os.listdir(train_dir)
-                              if os.path.isdir(os.path.join(train_dir, d))])
-            if classes:
-                return classes
+    def _load_image_array(self, image):
+        """Load a path, PIL image or pixel array as a resized RGB array"""
+        if isinstance(image, np.ndarray):
+            if image.shape[:2] == self.img_size[::-1] and image.dtype == np.uint8:
+                return image
+            image = Image.fromarray(np.asarray(image, dtype=np.uint8))
+        return np.asarray(load_image(image, self.img_size))
+
+    def _format_result(self, predictions):
+        """Turn one probability vector into a result dictionary"""
+        predicted_class_idx = np.argmax(predictions)
+        return {
+            'class': self.class_names[predicted_class_idx],
+            'confidence': float(predictions[predicted_class_idx]),
+            'class_index': predicted_class_idx,
+            'all_predictions': predictions
+        }
+
+    def iter_predictions(self, images, batch_size=32):
+        """
+        Yield one result per input, in input order.
+
+        Inputs can be file paths, PIL images or HxWx3 pixel arrays (0-255).
+        Images are grouped into fixed-size batches so the model runs once
+        per batch instead of once per image. Inputs that fail to load
+        yield None, like predict_image.
+        """
+        # Decode straight into the backend's (preallocated, if it has one) input buffer
+        batch = self.predictor.input_buffer(batch_size)
+        slots = []  # one entry per input: row in batch, or None if it failed
+
+        def flush():
+            filled = sum(1 for slot in slots if slot is not None)
+            predictions = self.predictor.predict(batch[:filled])
+            for slot in slots:
+                yield None if slot is None else self._format_result(predictions[slot])
+            slots.clear()
+
+        filled = 0
+        for image in images:
+            try:
+                batch[filled] = self._load_image_array(image)
+                slots.append(filled)
+                filled += 1
+            except Exception as e:
+                print(f"Error: {e}")
+                slots.append(None)
+
+            if filled == batch_size:
+                yield from flush()
+                filled = 0
 
-        # Fallback to our assumed classes
-        return ['Aloe Vera', 'Tulsi', 'Neem', 'Turmeric', 'Ginger',
-                'Ashwagandha', 'Brahmi', 'Giloy', 'Henna', 'Lemongrass']
+        if slots:
+            yield from flush()
+
+    def predict_batch(self, images, batch_size=32):
+        """Predict a list or iterator of images; returns results in order"""
+        return list(self.iter_predictions(images, batch_size=batch_size))
+
+    def predict_paths(self, image_paths, batch_size=32):
+        """Predict image files in batches; each result also carries its path"""
+        image_paths = list(image_paths)
+        results = self.predict_batch(image_paths, batch_size=batch_size)
+        for path, result in zip(image_paths, results):
+            if result is not None:
+                result['path'] = path
+        return results
+
+    def predict_arrays(self, arrays):
+        """Run the model on a stacked uint8 batch and return probabilities"""
+        return self.predictor.predict(np.asarray(arrays, dtype=np.uint8))
 
     def predict_image(self, image_path):
-        try:
-            # Load and preprocess image
-            img = Image.open(image_path)
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            img = img.resize(self.img_size)
-            img_array = np.array(img) / 255.0
-            img_array = np.expand_dims(img_array, axis=0)
-
-            # Predict
-            predictions = self.model.predict(img_array)
-            predicted_class_idx = np.argmax(predictions[0])
-            confidence = predictions[0][predicted_class_idx]
-            predicted_class = self.class_names[predicted_class_idx]
-
-            return {
-                'class': predicted_class,
-                'confidence': float(confidence),
-                'class_index': predicted_class_idx,
-                'all_predictions': predictions[0]
-            }
-        except Exception as e:
-            print(f"Error: {e}")
-            return None
+        return self.predict_batch([image_path], batch_size=1)[0]
 
+    def classify_directory(self, root_dir, writer, batch_size=32, top_k=5, workers=None):
+        """
+        Classify every image under root_dir and stream rows to writer.
 
-def main():
-    predictor = MedicinalPlantPredictor()
+        Decoding and resizing run in a thread pool that stays one batch
+        ahead of the model, so the next batch is being decoded while the
+        current one is in the forward pass. Returns (images, seconds).
+        """
+        image_paths = find_images(root_dir)
+        batches = (image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size))
+        workers = workers or os.cpu_count() or 1
+        processed = 0
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            def submit(batch_paths):
+                return batch_paths, [pool.submit(self._load_image_array, path) for path in batch_paths]
+
+            first_batch = next(batches, None)
+            pending = deque([submit(first_batch)] if first_batch else [])
+            while pending:
+                batch_paths, futures = pending.popleft()
+                next_batch = next(batches, None)
+                if next_batch:
+                    pending.append(submit(next_batch))
+
+                arrays, errors = [], {}
+                for path, future in zip(batch_paths, futures):
+                    try:
+                        arrays.append(future.result())
+                    except Exception as e:
+                        errors[path] = str(e)
+
+                probabilities = iter(self.predict_arrays(arrays) if arrays else [])
+                for path in batch_paths:
+                    if path in errors:
+                        writer.write({'path': path, 'classes': [], 'confidences': [], 'error': errors[path]})
+                        continue
+                    probs = next(probabilities)
+                    top = np.argsort(probs)[::-1][:top_k]
+                    writer.write({
+                        'path': path,
+                        'classes': [self.class_names[i] for i in top],
+                        'confidences': [float(probs[i]) for i in top],
+                        'error': None
+                    })
+                writer.flush()
+                processed += len(batch_paths)
+                print(f"  Processed {processed}/{len(image_paths)} images", end='\r')
+
+        elapsed = time.perf_counter() - start
+        print()
+        return processed, elapsed
+
+
+def find_images(root_dir):
+    """
+    Return all image files under root_dir in a stable, sorted order.
+
+    A plain listing, not the dataset manifest: ad-hoc folders are read
+    once, so hashing every file up front would only double the I/O.
+    """
+    image_paths = []
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        dirnames.sort()
+        image_paths.extend(os.path.join(dirpath, f) for f in sorted(filenames)
+                           if f.lower().endswith(IMAGE_EXTENSIONS))
+    return image_paths
+
+
+class CSVResultWriter:
+    """Write one CSV row per image with class_N / confidence_N columns"""
+
+    def __init__(self, path, top_k):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.top_k = top_k
+        header = ['path']
+        for i in range(1, top_k + 1):
+            header += [f'class_{i}', f'confidence_{i}']
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(header + ['error'])
+
+    def write(self, row):
+        values = [row['path']]
+        for i in range(self.top_k):
+            if i < len(row['classes']):
+                values += [row['classes'][i], f"{row['confidences'][i]:.6f}"]
+            else:
+                values += ['', '']
+        self.writer.writerow(values + [row['error'] or ''])
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
 
-    # Use the exact path we found
-    image_path = "dataset/validation/Arive-Dantu/AV-S-001.jpg"
 
+class JSONLResultWriter:
+    """Write one JSON object per line"""
+
+    def __init__(self, path, top_k):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, row):
+        self.file.write(json.dumps(row) + '\n')
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetResultWriter:
+    """Write results as Parquet, one row group per flushed batch (needs pyarrow)"""
+
+    def __init__(self, path, top_k):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ('path', pa.string()),
+            ('classes', pa.list_(pa.string())),
+            ('confidences', pa.list_(pa.float32())),
+            ('error', pa.string())
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+
+    def flush(self):
+        if self.rows:
+            self.writer.write_table(self.pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+RESULT_WRITERS = {
+    'csv': CSVResultWriter,
+    'jsonl': JSONLResultWriter,
+    'parquet': ParquetResultWriter
+}
+
+
+def print_single_prediction(predictor, image_path):
+    """Print the detailed report for one image"""
     # Fix path separators for Windows
     image_path = image_path.replace('\\', '/')
 
@@ -99,5 +293,65 @@ def main():
         print("Please check the file path.")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Classify medicinal plant leaf images")
+    parser.add_argument('input', nargs='?', default="dataset/validation/Arive-Dantu/AV-S-001.jpg",
+                        help="Image file, or a directory to classify recursively")
+    parser.add_argument('--model', default='models/best_model.h5',
+                        help="Model artifact: .h5, .tflite, .onnx or a SavedModel directory")
+    parser.add_argument('--backend', default=None,
+                        help="Force an inference backend (keras, specialists, savedmodel, tflite, onnx)")
+    parser.add_argument('--fast-model', default=None,
+                        help="Compact first-stage model; --model then only sees unsure images")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Cascade: escalate when the fast model's confidence is below this")
+    parser.add_argument('--output', default='predictions.csv',
+                        help="Results file for directory mode (.csv, .jsonl or .parquet)")
+    parser.add_argument('--format', choices=sorted(RESULT_WRITERS),
+                        help="Output format (default: from the --output extension)")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Decode threads (default: number of CPU cores)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    predictor = MedicinalPlantPredictor(args.model, args.backend, args.fast_model, args.threshold)
+
+    if not os.path.isdir(args.input):
+        print_single_prediction(predictor, args.input)
+        return
+
+    output_format = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if output_format not in RESULT_WRITERS:
+        print(f"❌ Unknown output format: {output_format}")
+        return
+
+    print(f"Classifying images under: {args.input}")
+    writer = RESULT_WRITERS[output_format](args.output, args.top_k)
+    try:
+        count, elapsed = predictor.classify_directory(args.input, writer,
+                                                      batch_size=args.batch_size,
+                                                      top_k=args.top_k,
+                                                      workers=args.workers)
+    finally:
+        writer.close()
+
+    print("\n" + "=" * 60)
+    print("📦 BATCH CLASSIFICATION COMPLETE")
+    print("=" * 60)
+    print(f"🖼️  Images: {count}")
+    print(f"⏱️  Time: {elapsed:.2f}s")
+    print(f"🚀 Throughput: {count / elapsed if elapsed > 0 else 0:.1f} images/sec")
+    if hasattr(predictor.predictor, 'get_stats'):
+        stats = predictor.predictor.get_stats()
+        print(f"🪜 Escalated to --model: {stats['escalation_rate'] * 100:.1f}% "
+              f"(model cost {stats['avg_ms_per_image']:.2f} ms/img)")
+    print(f"📁 Results: {args.output}")
+    print("=" * 60)
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,152 @@
+import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Disk eviction trims to this fraction of max_disk_entries, so the
+# directory is rescanned only after that many more writes
+DISK_LOW_WATER = 0.9
+
+
+class PredictionCache:
+    """
+    Content-addressed cache of per-upload results.
+
+    Entries are keyed by a BLAKE2b hash of the uploaded file's bytes, so a
+    re-upload of the same photo (or a Streamlit rerun) finds its decoded
+    validation outcome and probabilities without touching the image or
+    the model. The in-memory tier is a bounded LRU; an optional on-disk
+    tier (one .npz per entry) is shared across sessions and processes.
+
+    Records are flat dicts of numbers, strings, booleans and NumPy arrays.
+    """
+
+    def __init__(self, max_entries=256, disk_dir=None, max_disk_entries=10000, namespace=''):
+        """
+        Args:
+            max_entries: In-memory LRU capacity
+            disk_dir: Directory for the shared on-disk tier (None disables it)
+            max_disk_entries: Oldest on-disk entries are removed beyond this
+            namespace: Mixed into every key, e.g. the model checksum, so
+                results from different models never collide
+        """
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.namespace = namespace
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_count = None  # .npz files on disk, counted on the first write
+
+    def key_for(self, data):
+        """Cache key for raw uploaded bytes"""
+        digest = hashlib.blake2b(data, digest_size=16)
+        digest.update(self.namespace.encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached record for key, or None"""
+        with self._lock:
+            record = self._entries.get(key)
+            if record is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return record
+
+        record = self._read_disk(key)
+        with self._lock:
+            if record is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, record)
+        return record
+
+    def put(self, key, record):
+        """Insert or update the record for key in every tier"""
+        with self._lock:
+            self._store(key, record)
+        self._write_disk(key, record)
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries)
+        }
+
+    def _store(self, key, record):
+        self._entries[key] = record
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.npz')
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                record = {k: (v.item() if v.ndim == 0 else v) for k, v in data.items()}
+            os.utime(path)  # mark as recently used for disk eviction
+            return record
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, record):
+        if not self.disk_dir:
+            return
+        # Write to a temp file and rename so other processes never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **{k: np.asarray(v) for k, v in record.items()})
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        # Only scan the directory once the running count passes the limit;
+        # rewrites and other processes' entries are reconciled by that scan
+        with self._lock:
+            if self._disk_count is None:
+                self._disk_count = self._scan_disk_count()
+            else:
+                self._disk_count += 1
+            if self._disk_count <= self.max_disk_entries:
+                return
+            self._disk_count = self._evict_disk()
+
+    def _scan_disk_count(self):
+        with os.scandir(self.disk_dir) as it:
+            return sum(1 for e in it if e.name.endswith('.npz'))
+
+    def _evict_disk(self):
+        """Remove the least recently used entries down to the low-water mark. Returns the count left"""
+        entries = [e for e in os.scandir(self.disk_dir) if e.name.endswith('.npz')]
+        if len(entries) <= self.max_disk_entries:
+            return len(entries)
+        keep = int(self.max_disk_entries * DISK_LOW_WATER)
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - keep]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        return keep
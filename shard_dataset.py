@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+
+from dataset_cache import list_image_files, source_fingerprint
+from dataset_manifest import load_quarantine
+
+SHARD_ROOT = 'shards'
+INDEX_FILE = 'index.json'
+SHARD_BYTES = 128 * 1024 * 1024  # ~128 MB per shard
+READ_BUFFER_BYTES = 8 * 1024 * 1024  # one large sequential read per 8 MB
+SHUFFLE_BUFFER = 2048
+CYCLE_LENGTH = 8  # shards read concurrently while training
+
+RECORD_FEATURES = {
+    'image': tf.io.FixedLenFeature([], tf.string),
+    'label': tf.io.FixedLenFeature([], tf.int64),
+    'filename': tf.io.FixedLenFeature([], tf.string)
+}
+
+
+def split_shard_dir(data_dir, shard_root=SHARD_ROOT):
+    """Where a split's shards live, e.g. shards/dataset_train"""
+    name = os.path.normpath(data_dir).strip(os.sep).replace(os.sep, '_').replace(':', '')
+    return os.path.join(shard_root, name)
+
+
+def load_shard_index(shard_dir):
+    with open(os.path.join(shard_dir, INDEX_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _example(image_bytes, label, filename):
+    return tf.train.Example(features=tf.train.Features(feature={
+        'image': tf.train.Feature(bytes_list=tf.train.BytesList(value=[image_bytes])),
+        'label': tf.train.Feature(int64_list=tf.train.Int64List(value=[int(label)])),
+        'filename': tf.train.Feature(bytes_list=tf.train.BytesList(value=[filename.encode()]))
+    })).SerializeToString()
+
+
+def write_shards(data_dir, shard_root=SHARD_ROOT, shard_bytes=SHARD_BYTES, seed=42, force=False):
+    """
+    Pack a class-folder split into ~shard_bytes TFRecord shards of the
+    original encoded image bytes, plus an index.json listing the shards,
+    class names and every record's filename and label in record order.
+
+    Records are written in a fixed random order so every shard mixes all
+    classes; a reader then only needs a small shuffle buffer. Skipped when
+    the index's fingerprint still matches the source files.
+
+    Returns: the shard directory
+    """
+    shard_dir = split_shard_dir(data_dir, shard_root)
+    class_names, filenames, labels = list_image_files(data_dir)
+    fingerprint = source_fingerprint(data_dir, filenames)
+
+    index_path = os.path.join(shard_dir, INDEX_FILE)
+    if not force and os.path.exists(index_path) and load_shard_index(shard_dir).get('fingerprint') == fingerprint:
+        print(f"✓ {shard_dir} is up to date")
+        return shard_dir
+
+    print(f"Sharding {data_dir}: {len(filenames)} images -> {shard_dir}")
+    start = time.perf_counter()
+    os.makedirs(shard_dir, exist_ok=True)
+    # A half-written set of shards must never look valid
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    for stale in os.listdir(shard_dir):
+        if stale.endswith('.tfrecord'):
+            os.remove(os.path.join(shard_dir, stale))
+
+    order = np.random.default_rng(seed).permutation(len(filenames))
+    shards, writer, written = [], None, 0
+    for i in order:
+        if writer is None or written >= shard_bytes:
+            if writer:
+                writer.close()
+            shards.append({'file': f'shard-{len(shards):05d}.tfrecord', 'count': 0, 'bytes': 0})
+            writer = tf.io.TFRecordWriter(os.path.join(shard_dir, shards[-1]['file']))
+            written = 0
+        with open(os.path.join(data_dir, filenames[i]), 'rb') as f:
+            record = _example(f.read(), labels[i], filenames[i])
+        writer.write(record)
+        written += len(record)
+        shards[-1]['count'] += 1
+        shards[-1]['bytes'] += len(record)
+    if writer:
+        writer.close()
+
+    index = {
+        'source_dir': data_dir,
+        'class_names': class_names,
+        'shards': shards,
+        'filenames': [filenames[i] for i in order],
+        'labels': [int(labels[i]) for i in order],
+        'fingerprint': fingerprint,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+
+    total = sum(s['bytes'] for s in shards)
+    print(f"✓ {len(shards)} shards ({total / 1e6:.0f} MB) written in {time.perf_counter() - start:.1f}s")
+    return shard_dir
+
+
+def quarantined_filenames(index):
+    """Filenames of the index that dataset_health.py has quarantined since the shards were written"""
+    quarantine = load_quarantine()
+    if not quarantine:
+        return set()
+    root = os.path.realpath(index['source_dir'])
+    return {f for f in index['filenames'] if os.path.join(root, f) in quarantine}
+
+
+def _parse_record(record):
+    example = tf.io.parse_single_example(record, RECORD_FEATURES)
+    return example['image'], example['label'], example['filename']
+
+
+def read_shards(shard_dir, index, training=False, seed=None, exclude=(),
+                shuffle_buffer=SHUFFLE_BUFFER, cycle_length=CYCLE_LENGTH):
+    """
+    (encoded image bytes, label) pairs streamed from a split's shards,
+    skipping records whose filename is in exclude (quarantined files).
+
+    Training shuffles the shard order every epoch, interleaves
+    cycle_length shards at once and shuffles records in a buffer on top.
+    Otherwise shards are read one after another, so records come in
+    index order (index['filenames'] / index['labels']).
+    """
+    paths = [os.path.join(shard_dir, s['file']) for s in index['shards']]
+    if not training:
+        records = tf.data.TFRecordDataset(paths, buffer_size=READ_BUFFER_BYTES)
+    else:
+        files = tf.data.Dataset.from_tensor_slices(paths)
+        files = files.shuffle(len(paths), seed=seed, reshuffle_each_iteration=True)
+        records = files.interleave(
+            lambda path: tf.data.TFRecordDataset(path, buffer_size=READ_BUFFER_BYTES),
+            cycle_length=min(cycle_length, len(paths)),
+            num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+        records = records.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    records = records.map(_parse_record, num_parallel_calls=tf.data.AUTOTUNE)
+
+    if exclude:
+        excluded = tf.lookup.StaticHashTable(
+            tf.lookup.KeyValueTensorInitializer(sorted(exclude), [1] * len(exclude),
+                                                key_dtype=tf.string, value_dtype=tf.int32),
+            default_value=0)
+        records = records.filter(lambda image, label, filename: tf.equal(excluded.lookup(filename), 0))
+    return records.map(lambda image, label, filename: (image, label))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack class-folder splits into sequential TFRecord shards")
+    parser.add_argument('splits', nargs='*', default=['dataset/train', 'dataset/validation', 'dataset/test'])
+    parser.add_argument('--output-dir', default=SHARD_ROOT)
+    parser.add_argument('--shard-mb', type=int, default=SHARD_BYTES // (1024 * 1024))
+    parser.add_argument('--force', action='store_true', help="Rewrite even if the shards are current")
+    args = parser.parse_args()
+
+    for split in args.splits:
+        write_shards(split, args.output_dir, args.shard_mb * 1024 * 1024, force=args.force)
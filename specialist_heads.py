@@ -0,0 +1,161 @@
+import os
+import argparse
+import numpy as np
+
+SPECIALISTS_FILE = 'specialists.npz'
+SPECIALISTS_SUFFIX = '.specialists.npz'
+
+
+def specialists_path(model_path):
+    """Sidecar holding a model's specialist heads, next to it like its metadata"""
+    if os.path.isdir(model_path):
+        return os.path.join(model_path, SPECIALISTS_FILE)
+    return model_path + SPECIALISTS_SUFFIX
+
+
+class SpecialistHeads:
+    """
+    Binary logistic-regression heads for the main model's most confused
+    class pairs.
+
+    Each head sees the features feeding the main model's final layer and
+    decides between its two classes. It is applied only to rows whose
+    top-2 classes are exactly its pair. The pair's combined probability
+    mass is then split by the head's decision, so rows stay normalized and
+    all other classes are untouched.
+    """
+
+    def __init__(self, pairs, weights, biases, num_classes):
+        """
+        Args:
+            pairs: (P, 2) class indices; head i predicts P(pairs[i, 1] | pair)
+            weights: (P, D) head weights over the D-dim features
+            biases: (P,) head biases
+            num_classes: Number of outputs of the main model
+        """
+        self.pairs = np.asarray(pairs, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.biases = np.asarray(biases, dtype=np.float32)
+
+        # (C, C) lookup from an ordered class pair to its head, -1 where there is none
+        self.head_for = np.full((num_classes, num_classes), -1, dtype=np.int64)
+        self.head_for[self.pairs[:, 0], self.pairs[:, 1]] = np.arange(len(self.pairs))
+        self.head_for[self.pairs[:, 1], self.pairs[:, 0]] = np.arange(len(self.pairs))
+
+    def refine(self, probabilities, features):
+        """Return (refined probabilities, number of rows a head was applied to)"""
+        probabilities = np.array(probabilities, dtype=np.float32)
+        top2 = np.argpartition(probabilities, -2, axis=1)[:, -2:]
+        heads = self.head_for[top2[:, 0], top2[:, 1]]
+        rows = np.flatnonzero(heads >= 0)
+        if not len(rows):
+            return probabilities, 0
+
+        heads = heads[rows]
+        logits = np.einsum('nd,nd->n', features[rows], self.weights[heads]) + self.biases[heads]
+        second = 1.0 / (1.0 + np.exp(-logits))
+        first_idx, second_idx = self.pairs[heads, 0], self.pairs[heads, 1]
+        mass = probabilities[rows, first_idx] + probabilities[rows, second_idx]
+        probabilities[rows, first_idx] = mass * (1.0 - second)
+        probabilities[rows, second_idx] = mass * second
+        return probabilities, len(rows)
+
+
+def save_specialists(path, pairs, weights, biases):
+    np.savez(path, pairs=np.asarray(pairs), weights=np.asarray(weights), biases=np.asarray(biases))
+
+
+def load_specialists(path, num_classes):
+    """SpecialistHeads from a sidecar, or None if the model has none"""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return SpecialistHeads(data['pairs'], data['weights'], data['biases'], num_classes)
+
+
+def find_confused_pairs(model_path, data_dir, top_n):
+    """The top_n most confused unordered class pairs of the model on data_dir"""
+    from comprehensive_model_analysis import ModelAnalyzer
+
+    analyzer = ModelAnalyzer(model_path, data_dir)
+    analyzer.load_and_predict()
+    pairs = []
+    # Both directions of a pair are listed separately, so look twice as deep
+    for pair in analyzer.find_most_confused_pairs(top_n=2 * top_n):
+        names = tuple(sorted((pair['True'], pair['Predicted'])))
+        if names not in pairs:
+            pairs.append(names)
+    return pairs[:top_n]
+
+
+def load_class_outputs(backend, data_dir, class_name, batch_size=32):
+    """Main-model probabilities and features of every image of one class folder"""
+    from dataset_manifest import load_manifest
+    from image_pipeline import load_image
+
+    paths = load_manifest(data_dir).image_paths(class_name)
+    probabilities, features = [], []
+    for i in range(0, len(paths), batch_size):
+        batch = np.stack([np.asarray(load_image(p), dtype=np.uint8) for p in paths[i:i + batch_size]])
+        batch_probabilities, batch_features = backend.predict_with_features(batch)
+        probabilities.append(batch_probabilities)
+        features.append(batch_features)
+    return np.concatenate(probabilities), np.concatenate(features)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train binary specialist heads for the most confused class pairs")
+    parser.add_argument('--model', default='models/best_model.h5')
+    parser.add_argument('--train-dir', default='dataset/train')
+    parser.add_argument('--validation-dir', default='dataset/validation')
+    parser.add_argument('--top-pairs', type=int, default=5)
+    args = parser.parse_args()
+
+    from sklearn.linear_model import LogisticRegression
+    from inference_backends import load_backend  # imports this module
+
+    # Pairs come from the validation set so the test set stays untouched
+    pairs = find_confused_pairs(args.model, args.validation_dir, args.top_pairs)
+    backend = load_backend(args.model, 'specialists')
+    class_names = backend.class_names
+
+    kept_pairs, weights, biases = [], [], []
+    print("\n" + "=" * 70)
+    print("SPECIALIST HEADS")
+    print("=" * 70)
+    for name_a, name_b in pairs:
+        a, b = class_names.index(name_a), class_names.index(name_b)
+        _, train_a = load_class_outputs(backend, args.train_dir, name_a)
+        _, train_b = load_class_outputs(backend, args.train_dir, name_b)
+        head = LogisticRegression(C=1.0, class_weight='balanced', max_iter=2000)
+        head.fit(np.concatenate([train_a, train_b]),
+                 np.concatenate([np.zeros(len(train_a)), np.ones(len(train_b))]))
+
+        # Pair accuracy on validation images of the two classes: main model vs head
+        probs_a, val_a = load_class_outputs(backend, args.validation_dir, name_a)
+        probs_b, val_b = load_class_outputs(backend, args.validation_dir, name_b)
+        val_labels = np.concatenate([np.zeros(len(val_a)), np.ones(len(val_b))])
+        val_probs = np.concatenate([probs_a, probs_b])
+        head_acc = np.mean(head.predict(np.concatenate([val_a, val_b])) == val_labels)
+        main_acc = np.mean((val_probs[:, b] > val_probs[:, a]) == val_labels)
+
+        keep = head_acc >= main_acc
+        print(f"{name_a} vs {name_b}: main {main_acc * 100:.1f}% -> head {head_acc * 100:.1f}% "
+              f"{'✓ kept' if keep else '✗ dropped'}")
+        if keep:
+            kept_pairs.append((a, b))
+            weights.append(head.coef_[0])
+            biases.append(head.intercept_[0])
+
+    if not kept_pairs:
+        print("No head beat the main model; nothing saved")
+        return
+    path = specialists_path(args.model)
+    save_specialists(path, kept_pairs, weights, biases)
+    print(f"✓ {len(kept_pairs)} specialist heads saved to {path}")
+    print("Serve them with --backend specialists (or PLANT_MODEL_BACKEND=specialists)")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import numpy as np
+from tensorflow import keras
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+
+from feature_cache import BestModelCheckpoint
+
+
+class EpochTimer(keras.callbacks.Callback):
+    """Records wall-clock seconds of every training epoch"""
+
+    def on_train_begin(self, logs=None):
+        self.epoch_times = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.epoch_times.append(time.perf_counter() - self._start)
+
+
+def split_frozen_prefix(base_model, num_trainable=30):
+    """
+    Split base_model into a frozen prefix and a suffix holding at least
+    its last num_trainable layers.
+
+    The cut has to be a single tensor that no residual connection
+    crosses, so starting just before the trainable layers this walks back
+    until the suffix is a self-contained graph. Both halves share layers
+    (and weights) with base_model.
+
+    Returns: (prefix model, suffix model, name of the cut layer)
+    """
+    last_frozen = len(base_model.layers) - num_trainable - 1
+    for index in range(last_frozen, 0, -1):
+        cut = base_model.layers[index]
+        try:
+            suffix = keras.Model(cut.output, base_model.output, name=f'{base_model.name}_suffix')
+        except ValueError:
+            continue  # a skip connection reaches past this layer
+        prefix = keras.Model(base_model.input, cut.output, name=f'{base_model.name}_prefix_{cut.name}')
+        return prefix, suffix, cut.name
+    raise ValueError(f"No single-tensor cut point found in {base_model.name}")
+
+
+def build_split_model(model, suffix):
+    """
+    Trainable part of `model` as a model over cached prefix activations:
+    the backbone suffix followed by the head (model.layers[1:]). Layers
+    are shared, so training it trains `model`.
+    """
+    return keras.Sequential([keras.Input(shape=suffix.input_shape[1:]), suffix, *model.layers[1:]],
+                            name=f'{model.name}_split')
+
+
+def time_full_pipeline_epoch(model, data, steps=20, optimizer=None):
+    """
+    Seconds per epoch of end-to-end training (decode, augment, full
+    forward and backward), estimated from `steps` timed steps on a
+    throwaway copy of model so its weights are untouched.
+    """
+    clone = keras.models.clone_model(model)
+    clone.set_weights(model.get_weights())
+    clone.compile(optimizer=optimizer or keras.optimizers.Adam(1e-4),
+                  loss='categorical_crossentropy', metrics=['accuracy'])
+    timer = EpochTimer()
+    steps = min(steps, len(data))
+    # The first epoch pays for tracing; time the second
+    clone.fit(data.dataset.take(steps), epochs=2, callbacks=[timer], verbose=0)
+    return timer.epoch_times[-1] * len(data) / steps
+
+
+def run_end_to_end_fine_tune(model, num_trainable, train_data, val_data, test_data, epochs,
+                             learning_rate, checkpoint_path='models/phase2_baseline.h5'):
+    """
+    The regular (PHASE2_SPLIT_MODEL=False) fine-tune, run on a copy of
+    model so split training still starts from the same phase-1 weights.
+    Keeps the best val_accuracy checkpoint like the real run does.
+
+    Returns: reference dict for report_split_training
+    """
+    clone = keras.models.clone_model(model)
+    clone.set_weights(model.get_weights())
+    base = clone.layers[0]
+    base.trainable = True
+    for layer in base.layers[:-num_trainable]:
+        layer.trainable = False
+    clone.compile(optimizer=keras.optimizers.Adam(learning_rate),
+                  loss='categorical_crossentropy', metrics=['accuracy'])
+
+    checkpoint = BestModelCheckpoint(clone, checkpoint_path)
+    timer = EpochTimer()
+    clone.fit(train_data.dataset, epochs=epochs, validation_data=val_data.dataset,
+              callbacks=[checkpoint,
+                         EarlyStopping(monitor='val_accuracy', patience=15, verbose=1),
+                         ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=1e-7, verbose=1),
+                         timer],
+              verbose=1)
+    checkpoint.restore()
+    _, val_accuracy = clone.evaluate(val_data.dataset, verbose=0)
+    _, test_accuracy = clone.evaluate(test_data.dataset, verbose=0)
+    return {
+        'val_accuracy': float(val_accuracy),
+        'test_accuracy': float(test_accuracy),
+        'epochs': len(timer.epoch_times),
+        'epoch_seconds': float(np.median(timer.epoch_times)),
+        'fine_tune_layers': num_trainable,
+        'train_samples': train_data.samples,
+        'source': 'baseline run'
+    }
+
+
+def save_reference(path, reference):
+    """Record end-to-end fine-tune accuracy for later split-training parity reports"""
+    reference = dict(reference, created=time.strftime('%Y-%m-%d %H:%M:%S'))
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(reference, f, indent=2)
+
+
+def load_reference(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def report_split_training(split_epoch_times, full_epoch_time, split_accuracy, reference):
+    """
+    Print the per-epoch speedup of split training and its accuracy next to
+    the regular end-to-end fine-tune (reference, None if never recorded).
+    Both accuracies come from the best checkpoint evaluated on the
+    unaugmented images through the full pipeline.
+    """
+    split_epoch = float(np.median(split_epoch_times))
+    print("\n" + "=" * 70)
+    print("SPLIT-MODEL FINE-TUNING REPORT")
+    print("=" * 70)
+    print(f"Full pipeline epoch (estimated): {full_epoch_time:8.1f}s")
+    if reference and reference.get('epoch_seconds'):
+        print(f"Full pipeline epoch (measured):  {reference['epoch_seconds']:8.1f}s")
+        full_epoch_time = reference['epoch_seconds']
+    print(f"Split-model epoch (median):      {split_epoch:8.1f}s")
+    print(f"Speedup per epoch:               {full_epoch_time / split_epoch:8.1f}x")
+
+    if not reference:
+        print(f"Split-trained val accuracy:  {split_accuracy['val_accuracy'] * 100:.2f}%")
+        print(f"Split-trained test accuracy: {split_accuracy['test_accuracy'] * 100:.2f}%")
+        print("⚠ No end-to-end reference recorded: set PHASE2_BASELINE_RUN = True or train once "
+              "with PHASE2_SPLIT_MODEL = False to compare against the regular fine-tune")
+    else:
+        print(f"\nReference: {reference.get('source', 'end-to-end fine-tune')} from {reference.get('created', '?')} "
+              f"({reference.get('train_samples', '?')} training images)")
+        print(f"{'':18} {'Split-trained':>14} {'End-to-end':>11} {'Gap':>8}")
+        for key, label in (('val_accuracy', 'Val accuracy'), ('test_accuracy', 'Test accuracy')):
+            gap = split_accuracy[key] - reference[key]
+            print(f"{label:18} {split_accuracy[key] * 100:13.2f}% {reference[key] * 100:10.2f}% "
+                  f"{gap * 100:+7.2f}")
+    print("=" * 70)
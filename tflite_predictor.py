@@ -0,0 +1,60 @@
+import os
+import numpy as np
+import tensorflow as tf
+
+
+class TFLitePredictor:
+    """
+    Run an exported .tflite model with the same interface as CompiledPredictor.
+
+    Takes raw uint8 HWC pixels. For float models (including float16
+    weight-quantized ones) pixels are rescaled to [0, 1]; for full-integer
+    models they are quantized with the input tensor's scale and zero
+    point. Quantized outputs are dequantized back to probabilities.
+    """
+
+    def __init__(self, model_path, num_threads=None):
+        self.model_path = model_path
+        self.interpreter = tf.lite.Interpreter(model_path=model_path,
+                                               num_threads=num_threads or os.cpu_count())
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()[0]
+        self.output_details = self.interpreter.get_output_details()[0]
+        self.input_shape = tuple(self.input_details['shape'][1:])
+        self.num_classes = int(self.output_details['shape'][-1])
+
+    def _prepare_input(self, image):
+        """Convert one uint8 image to what the interpreter's input tensor expects"""
+        dtype = self.input_details['dtype']
+        if dtype == np.float32:
+            return image.astype(np.float32) * (1.0 / 255.0)
+
+        scale, zero_point = self.input_details['quantization']
+        if abs(scale * 255.0 - 1.0) < 1e-6 and zero_point == 0 and dtype == np.uint8:
+            # Calibrated range is exactly [0, 1]: raw pixels are already quantized
+            return image
+        info = np.iinfo(dtype)
+        quantized = np.round(image.astype(np.float32) / 255.0 / scale + zero_point)
+        return np.clip(quantized, info.min, info.max).astype(dtype)
+
+    def _read_output(self):
+        output = self.interpreter.get_tensor(self.output_details['index'])[0]
+        if self.output_details['dtype'] != np.float32:
+            scale, zero_point = self.output_details['quantization']
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+    def predict(self, batch):
+        """Return class probabilities for a uint8 (N, H, W, 3) batch"""
+        batch = np.asarray(batch, dtype=np.uint8)
+        outputs = np.empty((len(batch), self.num_classes), dtype=np.float32)
+        for i, image in enumerate(batch):
+            self.interpreter.set_tensor(self.input_details['index'],
+                                        self._prepare_input(image)[np.newaxis])
+            self.interpreter.invoke()
+            outputs[i] = self._read_output()
+        return outputs
+
+    def predict_one(self, image):
+        """Return class probabilities for a single uint8 (H, W, 3) image"""
+        return self.predict(np.expand_dims(image, axis=0))[0]
@@ -0,0 +1,96 @@
+import os
+import argparse
+from tensorflow import keras
+from tensorflow.keras import layers, models
+from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
+from tensorflow.keras.applications import MobileNetV2
+
+from data_pipeline import TRAIN_AUGMENTATION, ImageFolderDataset
+from dataset_cache import DATASET_CACHE_DIR
+from model_metadata import save_metadata
+
+IMG_SIZE = (224, 224)
+BATCH_SIZE = 32
+
+
+def create_fast_model(num_classes, alpha=0.35):
+    """
+    Compact first stage for the cascade: MobileNetV2 at width multiplier
+    alpha with a single dense head. At alpha=0.35 it needs ~60M
+    multiply-adds per 224x224 image, about a fifth of the full-width
+    MobileNetV2, and takes the same input so both stages share one
+    preprocessed batch.
+    """
+    base_model = MobileNetV2(
+        input_shape=(*IMG_SIZE, 3),
+        include_top=False,
+        weights='imagenet',
+        alpha=alpha
+    )
+    base_model.trainable = False
+
+    model = models.Sequential([
+        base_model,
+        layers.GlobalAveragePooling2D(),
+        layers.Dropout(0.3),
+        layers.Dense(num_classes, activation='softmax')
+    ])
+    return model, base_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the compact first-stage model of the cascade")
+    parser.add_argument('--train-dir', default='dataset/train')
+    parser.add_argument('--validation-dir', default='dataset/validation')
+    parser.add_argument('--output', default='models/fast_model.h5')
+    parser.add_argument('--alpha', type=float, default=0.35, help="MobileNetV2 width multiplier")
+    parser.add_argument('--epochs', type=int, default=20, help="Epochs per phase")
+    parser.add_argument('--dataset-cache', default=DATASET_CACHE_DIR,
+                        help="Compiled dataset cache root ('' to decode images every epoch)")
+    parser.add_argument('--shards', default=None,
+                        help="Stream the splits from this shard_dataset.py root instead")
+    args = parser.parse_args()
+
+    source = dict(shards=args.shards) if args.shards else dict(compiled=args.dataset_cache)
+    train_data = ImageFolderDataset(args.train_dir, IMG_SIZE, BATCH_SIZE, training=True,
+                                    augmentation=TRAIN_AUGMENTATION, **source)
+    val_data = ImageFolderDataset(args.validation_dir, IMG_SIZE, BATCH_SIZE, cache=True, **source)
+
+    # Same label order as the main model, so the two stages are interchangeable
+    class_names = train_data.class_names
+    model, base_model = create_fast_model(len(class_names), args.alpha)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    callbacks = [
+        ModelCheckpoint(args.output, monitor='val_accuracy', save_best_only=True, mode='max', verbose=1),
+        EarlyStopping(monitor='val_accuracy', patience=8, restore_best_weights=True, verbose=1),
+        ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=3, min_lr=1e-7, verbose=1)
+    ]
+
+    print("\n" + "=" * 70)
+    print(f"PHASE 1: Training the head on a frozen MobileNetV2 (alpha={args.alpha})...")
+    print("=" * 70)
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=1e-3),
+                  loss='categorical_crossentropy', metrics=['accuracy'])
+    history1 = model.fit(train_data.dataset, epochs=args.epochs,
+                         validation_data=val_data.dataset, callbacks=callbacks)
+
+    print("\n" + "=" * 70)
+    print("PHASE 2: Fine-tuning the last layers...")
+    print("=" * 70)
+    base_model.trainable = True
+    for layer in base_model.layers[:-30]:
+        layer.trainable = False
+    model.compile(optimizer=keras.optimizers.Adam(learning_rate=1e-4),
+                  loss='categorical_crossentropy', metrics=['accuracy'])
+    model.fit(train_data.dataset, epochs=len(history1.history['accuracy']) + args.epochs,
+              initial_epoch=len(history1.history['accuracy']),
+              validation_data=val_data.dataset, callbacks=callbacks)
+
+    save_metadata(args.output, class_names, input_size=IMG_SIZE, architecture=f'mobilenetv2_{args.alpha}')
+    print(f"\n✓ Fast model saved to {args.output}")
+    print("Next step: python cascade_predictor.py to pick a threshold")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import os
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+from tensorflow import keras
+from tensorflow.keras import layers
+from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+
+from dataset_manifest import load_manifest
+from image_pipeline import load_image
+from inference_backends import load_backend
+from leaf_gate import GATE_CLASS_NAMES, GATE_INPUT_SIZE, GATE_MODEL_PATH
+from model_metadata import save_metadata
+
+
+def list_images(root_dir):
+    """All image files under root_dir, recursively, in sorted order (from its manifest)"""
+    return load_manifest(root_dir).image_paths()
+
+
+def load_images(paths, input_size=GATE_INPUT_SIZE):
+    """Decode paths into a uint8 (N, H, W, 3) array, skipping unreadable files"""
+    images = []
+    for path in paths:
+        try:
+            images.append(np.asarray(load_image(path, input_size), dtype=np.uint8))
+        except (OSError, ValueError):
+            print(f"⚠ Skipping unreadable image: {path}")
+    return np.stack(images)
+
+
+def cifar10_negatives(num_samples, input_size=GATE_INPUT_SIZE, seed=42):
+    """Non-plant photos (vehicles, animals) from CIFAR-10, upscaled to the gate input"""
+    (x_train, _), _ = keras.datasets.cifar10.load_data()
+    rng = np.random.default_rng(seed)
+    sample = x_train[rng.choice(len(x_train), size=min(num_samples, len(x_train)), replace=False)]
+    return tf.image.resize(sample, input_size[::-1]).numpy().round().astype(np.uint8)
+
+
+def build_gate_model(input_size=GATE_INPUT_SIZE):
+    """
+    Tiny leaf / not-leaf CNN: strided convolutions down to 8x8, then
+    depthwise-separable blocks and global pooling. About 30k parameters
+    and ~4M multiply-adds per 64x64 image, versus ~300M for MobileNetV2
+    at 224x224. Inputs are rescaled to [0, 1] like the main model's.
+    """
+    inputs = keras.Input(shape=(input_size[1], input_size[0], 3))
+    x = inputs
+    for filters in (16, 32, 64):
+        x = layers.Conv2D(filters, 3, strides=2, padding='same', use_bias=False)(x)
+        x = layers.BatchNormalization()(x)
+        x = layers.ReLU()(x)
+        x = layers.SeparableConv2D(filters, 3, padding='same', activation='relu')(x)
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.Dropout(0.2)(x)
+    outputs = layers.Dense(len(GATE_CLASS_NAMES), activation='softmax')(x)
+    return keras.Model(inputs, outputs, name='leaf_gate')
+
+
+def make_dataset(images, labels, batch_size, training):
+    augment = keras.Sequential([
+        layers.RandomFlip('horizontal_and_vertical'),
+        layers.RandomRotation(0.1),
+        layers.RandomZoom(0.2),
+        layers.RandomContrast(0.2)
+    ])
+    dataset = tf.data.Dataset.from_tensor_slices((images, labels))
+    if training:
+        dataset = dataset.shuffle(len(images), seed=42)
+    dataset = dataset.batch(batch_size)
+    dataset = dataset.map(lambda x, y: (tf.cast(x, tf.float32) * (1.0 / 255.0), y),
+                          num_parallel_calls=tf.data.AUTOTUNE)
+    if training:
+        dataset = dataset.map(lambda x, y: (augment(x, training=True), y),
+                              num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def measure_latency(backend, num_runs=50):
+    """Median ms per single-image prediction through an InferenceBackend"""
+    image = np.zeros(backend.input_shape, dtype=np.uint8)
+    times = []
+    for _ in range(num_runs):
+        start = time.perf_counter()
+        backend.predict_one(image)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the leaf / not-leaf gate that runs before the main classifier")
+    parser.add_argument('--leaf-dirs', nargs='+', default=['dataset/train', 'dataset/validation'],
+                        help="Class-folder datasets whose images are all leaves")
+    parser.add_argument('--negatives-dir', default='dataset/negatives',
+                        help="Non-leaf photos (people, hands, objects, scenes), any folder layout")
+    parser.add_argument('--cifar-negatives', type=int, default=0,
+                        help="Also add this many CIFAR-10 photos as negatives")
+    parser.add_argument('--main-model', default='models/best_model.h5',
+                        help="Main classifier, for the latency comparison")
+    parser.add_argument('--output', default=GATE_MODEL_PATH)
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    # Positives: every image of the existing dataset
+    leaf_paths = [p for d in args.leaf_dirs if os.path.isdir(d) for p in list_images(d)]
+    leaves = load_images(leaf_paths)
+
+    # Negatives: user-collected photos, optionally topped up with CIFAR-10
+    negative_sets = []
+    if os.path.isdir(args.negatives_dir):
+        negative_sets.append(load_images(list_images(args.negatives_dir)))
+    if args.cifar_negatives:
+        negative_sets.append(cifar10_negatives(args.cifar_negatives))
+    if not negative_sets:
+        raise SystemExit(f"❌ No negatives: add non-leaf photos to {args.negatives_dir} "
+                         f"or pass --cifar-negatives N")
+    negatives = np.concatenate(negative_sets)
+
+    leaf_label = GATE_CLASS_NAMES.index('leaf')
+    images = np.concatenate([leaves, negatives])
+    labels = np.concatenate([np.full(len(leaves), leaf_label),
+                             np.full(len(negatives), 1 - leaf_label)])
+    print(f"Leaves: {len(leaves)}  Negatives: {len(negatives)}")
+
+    # Shuffled 80/20 split
+    order = np.random.default_rng(42).permutation(len(images))
+    split = int(len(order) * 0.8)
+    train_idx, val_idx = order[:split], order[split:]
+
+    # Balance the two classes' contribution to the loss
+    counts = np.bincount(labels[train_idx], minlength=len(GATE_CLASS_NAMES))
+    class_weight = {i: len(train_idx) / (len(counts) * max(c, 1)) for i, c in enumerate(counts)}
+
+    model = build_gate_model()
+    model.compile(optimizer=keras.optimizers.Adam(1e-3),
+                  loss='sparse_categorical_crossentropy',
+                  metrics=['accuracy'])
+    model.summary()
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    model.fit(
+        make_dataset(images[train_idx], labels[train_idx], args.batch_size, training=True),
+        validation_data=make_dataset(images[val_idx], labels[val_idx], args.batch_size, training=False),
+        epochs=args.epochs,
+        class_weight=class_weight,
+        callbacks=[
+            EarlyStopping(monitor='val_accuracy', patience=8, restore_best_weights=True, verbose=1),
+            ModelCheckpoint(args.output, monitor='val_accuracy', save_best_only=True, verbose=1)
+        ]
+    )
+    save_metadata(args.output, GATE_CLASS_NAMES, input_size=GATE_INPUT_SIZE[::-1])
+
+    # Per-class validation accuracy and cost relative to the main model
+    gate = load_backend(args.output, 'keras')
+    val_pred = np.argmax(gate.predict(images[val_idx]), axis=1)
+
+    print("\n" + "=" * 60)
+    print("LEAF GATE RESULTS")
+    print("=" * 60)
+    for label, name in enumerate(GATE_CLASS_NAMES):
+        mask = labels[val_idx] == label
+        print(f"{name:10} accuracy: {np.mean(val_pred[mask] == label) * 100:.2f}% ({mask.sum()} images)")
+    print(f"Parameters: {gate.model.count_params():,}")
+
+    gate_ms = measure_latency(gate)
+    print(f"Gate latency: {gate_ms:.2f} ms/img")
+    if os.path.exists(args.main_model):
+        main_ms = measure_latency(load_backend(args.main_model))
+        print(f"Main model latency: {main_ms:.2f} ms/img ({gate_ms / main_ms * 100:.1f}% cost for the gate)")
+    print(f"✓ Leaf gate saved to {args.output}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
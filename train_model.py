@@ -6,7 +6,6 @@ sys.stdout = Logger('project_log.txt')
 import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers, models
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
 from tensorflow.keras.applications import MobileNetV2, EfficientNetB0
 import os
@@ -15,6 +14,13 @@ import numpy as np
 from sklearn.metrics import classification_report, confusion_matrix
 import seaborn as sns
 
+from data_pipeline import TRAIN_AUGMENTATION, ImageFolderDataset
+from feature_cache import BestModelCheckpoint, FeatureSequence, cached_features
+from model_metadata import save_metadata
+from split_training import (EpochTimer, build_split_model, load_reference, report_split_training,
+                            run_end_to_end_fine_tune, save_reference, split_frozen_prefix,
+                            time_full_pipeline_epoch)
+
 # =============================================
 # 1. CONFIGURATION
 # =============================================
@@ -23,66 +29,71 @@ BATCH_SIZE = 32
 EPOCHS = 100
 LEARNING_RATE = 0.001
 
+# Phase 1 trains only the head, so the frozen backbone's pooled features can be
+# computed once (for FEATURE_CACHE_VIEWS augmented views per image), cached as a
+# float16 memmap and reused every epoch instead of re-running MobileNetV2
+PHASE1_FEATURE_CACHE = True
+FEATURE_CACHE_VIEWS = 5
+FEATURE_CACHE_DIR = 'cache/phase1_features'
+
+# Phase 2 only updates the last FINE_TUNE_LAYERS layers of the backbone, so the
+# frozen prefix's activations can be cached for a fixed bank of augmented views
+# and only the suffix + head trained on them
+PHASE2_SPLIT_MODEL = True
+FINE_TUNE_LAYERS = 30
+PHASE2_AUGMENTATION_VIEWS = 3
+PHASE2_CACHE_DIR = 'cache/phase2_activations'
+
+# Accuracy of the regular end-to-end fine-tune, for the split-training parity
+# report. Recorded by every PHASE2_SPLIT_MODEL = False run, or by a baseline
+# fine-tune of a copy of the model when PHASE2_BASELINE_RUN is set (slow)
+PHASE2_REFERENCE_PATH = 'models/phase2_end_to_end_reference.json'
+PHASE2_BASELINE_RUN = False
+
+# Every split is decoded and resized once into a uint8 memmap (dataset_cache.py)
+# and batches are sliced from it; rebuilt automatically when files change.
+# None decodes the JPEGs every epoch.
+DATASET_CACHE_DIR = 'cache/datasets'
+
+# On network storage, pack the splits into large TFRecord shards once
+# (python shard_dataset.py) and set this to their root ('shards') to stream
+# them with sequential reads; takes the place of DATASET_CACHE_DIR
+SHARD_ROOT = None
+
 # Update these paths to your dataset
 TRAIN_DIR = 'dataset/train'
 VALIDATION_DIR = 'dataset/validation'
 TEST_DIR = 'dataset/test'
 
 # =============================================
-# 2. DATA AUGMENTATION (Key for Accuracy!)
+# 2. DATA PIPELINE (Key for Accuracy!)
 # =============================================
-train_datagen = ImageDataGenerator(
-    rescale=1. / 255,
-    rotation_range=40,  # Rotate images
-    width_shift_range=0.2,  # Shift horizontally
-    height_shift_range=0.2,  # Shift vertically
-    shear_range=0.2,  # Shear transformation
-    zoom_range=0.2,  # Zoom in/out
-    horizontal_flip=True,  # Flip horizontally
-    vertical_flip=True,  # Flip vertically (good for leaves)
-    brightness_range=[0.8, 1.2],  # Adjust brightness
-    fill_mode='nearest'
-)
-
-# Validation and test data - only rescale, no augmentation
-validation_datagen = ImageDataGenerator(rescale=1. / 255)
-test_datagen = ImageDataGenerator(rescale=1. / 255)
+# tf.data: parallel decode, in-graph batch augmentation (TRAIN_AUGMENTATION in
+# data_pipeline.py: rotation 40, shifts 0.2, shear, zoom, flips, brightness),
+# rescale to [0, 1] and autotuned prefetch. Images come pre-decoded from the
+# compiled dataset cache; without it, validation and test are not augmented,
+# so their decoded images are cached after the first pass.
 
 # =============================================
 # 3. LOAD DATA
 # =============================================
 print("Loading training data...")
-train_generator = train_datagen.flow_from_directory(
-    TRAIN_DIR,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    class_mode='categorical',
-    shuffle=True
-)
+source = dict(shards=SHARD_ROOT) if SHARD_ROOT else dict(compiled=DATASET_CACHE_DIR)
+train_data = ImageFolderDataset(TRAIN_DIR, IMG_SIZE, BATCH_SIZE, training=True,
+                                augmentation=TRAIN_AUGMENTATION, **source)
 
 print("\nLoading validation data...")
-validation_generator = validation_datagen.flow_from_directory(
-    VALIDATION_DIR,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    class_mode='categorical',
-    shuffle=False
-)
+val_data = ImageFolderDataset(VALIDATION_DIR, IMG_SIZE, BATCH_SIZE, cache=True, **source)
 
 print("\nLoading test data...")
-test_generator = test_datagen.flow_from_directory(
-    TEST_DIR,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    class_mode='categorical',
-    shuffle=False
-)
+test_data = ImageFolderDataset(TEST_DIR, IMG_SIZE, BATCH_SIZE, cache=True, **source)
 
-num_classes = len(train_generator.class_indices)
+num_classes = len(train_data.class_indices)
+class_names = list(train_data.class_indices.keys())
 print(f"\nNumber of classes: {num_classes}")
-print(f"Class names: {list(train_generator.class_indices.keys())}")
-print(f"Training samples: {train_generator.samples}")
-print(f"Validation samples: {validation_generator.samples}")
+print(f"Class names: {class_names}")
+print(f"Training samples: {train_data.samples}")
+print(f"Validation samples: {val_data.samples}")
 
 
 # =============================================
@@ -214,13 +225,49 @@ print("\n" + "=" * 70)
 print("PHASE 1: Training top layers with frozen base model...")
 print("=" * 70)
 
-history1 = model.fit(
-    train_generator,
-    epochs=30,
-    validation_data=validation_generator,
-    callbacks=callbacks,
-    verbose=1
-)
+if PHASE1_FEATURE_CACHE:
+    # Backbone + pooling once per image (and view); the head then trains on features
+    extractor = models.Sequential([base_model, model.layers[1]], name=base_model.name)
+    train_features, train_labels = cached_features(
+        extractor, train_data, FEATURE_CACHE_DIR, 'train', views=FEATURE_CACHE_VIEWS,
+        img_size=list(IMG_SIZE), augmentation=TRAIN_AUGMENTATION)
+    val_features, val_labels = cached_features(
+        extractor, val_data, FEATURE_CACHE_DIR, 'validation', img_size=list(IMG_SIZE))
+
+    # Shares its layers with `model`, so training it trains the full model's head;
+    # the checkpoint saves the full model whenever the head's val_accuracy improves
+    best_checkpoint = BestModelCheckpoint(model, 'models/best_model.h5')
+    head = models.Sequential([keras.Input(shape=(extractor.output_shape[-1],)), *model.layers[2:]])
+    head.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=LEARNING_RATE),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    history1 = head.fit(
+        FeatureSequence(train_features, train_labels, num_classes, BATCH_SIZE, shuffle=True),
+        epochs=30,
+        validation_data=FeatureSequence(val_features, val_labels, num_classes, BATCH_SIZE, shuffle=False),
+        callbacks=[
+            best_checkpoint,
+            EarlyStopping(monitor='val_accuracy', patience=15, restore_best_weights=True, verbose=1),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=1e-7, verbose=1)
+        ],
+        verbose=1
+    )
+    # EarlyStopping only restores the best weights when it stops early; phase 2
+    # starts from the best checkpoint either way
+    best_checkpoint.restore()
+else:
+    history1 = model.fit(
+        train_data.dataset,
+        epochs=30,
+        validation_data=val_data.dataset,
+        callbacks=callbacks,
+        verbose=1
+    )
+
+# Record labels and preprocessing next to the checkpoint so loaders never scan the dataset
+save_metadata('models/best_model.h5', class_names, input_size=IMG_SIZE)
 
 # Plot Phase 1 Accuracy
 plot_accuracy_comparison(history1.history['accuracy'],
@@ -236,7 +283,7 @@ print("=" * 70)
 
 # Unfreeze the last 30 layers of base model
 base_model.trainable = True
-for layer in base_model.layers[:-30]:
+for layer in base_model.layers[:-FINE_TUNE_LAYERS]:
     layer.trainable = False
 
 # Recompile with lower learning rate for fine-tuning
@@ -246,14 +293,62 @@ model.compile(
     metrics=['accuracy']
 )
 
-history2 = model.fit(
-    train_generator,
-    epochs=EPOCHS,
-    initial_epoch=len(history1.history['accuracy']),
-    validation_data=validation_generator,
-    callbacks=callbacks,
-    verbose=1
-)
+if PHASE2_SPLIT_MODEL and PHASE2_BASELINE_RUN:
+    print("Running the regular end-to-end fine-tune on a copy of the model (parity baseline)...")
+    save_reference(PHASE2_REFERENCE_PATH, run_end_to_end_fine_tune(
+        model, FINE_TUNE_LAYERS, train_data, val_data, test_data,
+        EPOCHS - len(history1.history['accuracy']), LEARNING_RATE / 10))
+
+if PHASE2_SPLIT_MODEL:
+    # Cache the frozen prefix's output once per view; train suffix + head on it
+    prefix, suffix, cut_name = split_frozen_prefix(base_model, FINE_TUNE_LAYERS)
+    print(f"Frozen prefix ends at '{cut_name}' -> activations {prefix.output_shape[1:]}")
+    train_acts, train_labels = cached_features(
+        prefix, train_data, PHASE2_CACHE_DIR, 'train', views=PHASE2_AUGMENTATION_VIEWS,
+        img_size=list(IMG_SIZE), augmentation=TRAIN_AUGMENTATION)
+    val_acts, val_labels = cached_features(
+        prefix, val_data, PHASE2_CACHE_DIR, 'validation', img_size=list(IMG_SIZE))
+
+    # Saves the full model; only epochs that beat phase 1's best replace its checkpoint
+    best_checkpoint = BestModelCheckpoint(model, 'models/best_model.h5')
+    best_checkpoint.best = max(history1.history['val_accuracy'])
+
+    split_model = build_split_model(model, suffix)
+    split_model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=LEARNING_RATE / 10),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    epoch_timer = EpochTimer()
+    history2 = split_model.fit(
+        FeatureSequence(train_acts, train_labels, num_classes, BATCH_SIZE, shuffle=True),
+        epochs=EPOCHS,
+        initial_epoch=len(history1.history['accuracy']),
+        validation_data=FeatureSequence(val_acts, val_labels, num_classes, BATCH_SIZE, shuffle=False),
+        callbacks=[
+            best_checkpoint,
+            EarlyStopping(monitor='val_accuracy', patience=15, restore_best_weights=True, verbose=1),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=1e-7, verbose=1),
+            epoch_timer
+        ],
+        verbose=1
+    )
+    model.load_weights('models/best_model.h5')
+    full_epoch_time = time_full_pipeline_epoch(model, train_data)
+else:
+    # With PHASE1_FEATURE_CACHE the shared ModelCheckpoint never saw phase 1;
+    # only epochs that beat phase 1's best may replace its checkpoint
+    callbacks[0].best = max(history1.history['val_accuracy'])
+    history2 = model.fit(
+        train_data.dataset,
+        epochs=EPOCHS,
+        initial_epoch=len(history1.history['accuracy']),
+        validation_data=val_data.dataset,
+        callbacks=callbacks,
+        verbose=1
+    )
+
+save_metadata('models/best_model.h5', class_names, input_size=IMG_SIZE)
 
 # Plot Phase 2 Accuracy
 plot_accuracy_comparison(history2.history['accuracy'],
@@ -336,10 +431,21 @@ print("=" * 70)
 best_model = keras.models.load_model('models/best_model.h5')
 
 # Evaluate
-test_loss, test_accuracy = best_model.evaluate(test_generator)
+test_loss, test_accuracy = best_model.evaluate(test_data.dataset)
 print(f"\nTest Accuracy: {test_accuracy * 100:.2f}%")
 print(f"Test Loss: {test_loss:.4f}")
 
+# Split training is judged against the regular fine-tune, on the same images
+_, best_val_accuracy = best_model.evaluate(val_data.dataset, verbose=0)
+final_accuracy = {'val_accuracy': float(best_val_accuracy), 'test_accuracy': float(test_accuracy)}
+if PHASE2_SPLIT_MODEL:
+    report_split_training(epoch_timer.epoch_times, full_epoch_time, final_accuracy,
+                          load_reference(PHASE2_REFERENCE_PATH))
+else:
+    save_reference(PHASE2_REFERENCE_PATH, dict(
+        final_accuracy, epochs=len(history2.history['accuracy']), fine_tune_layers=FINE_TUNE_LAYERS,
+        train_samples=train_data.samples, source='PHASE2_SPLIT_MODEL = False run'))
+
 
 # =============================================
 # 11. FINAL ACCURACY VISUALIZATION
@@ -381,10 +487,10 @@ plot_final_results(all_train_acc, all_val_acc, test_accuracy)
 # 12. DETAILED PREDICTIONS & METRICS
 # =============================================
 print("\nGenerating predictions...")
-predictions = best_model.predict(test_generator)
+predictions = best_model.predict(test_data.dataset)
 predicted_classes = np.argmax(predictions, axis=1)
-true_classes = test_generator.classes
-class_labels = list(test_generator.class_indices.keys())
+true_classes = test_data.classes
+class_labels = list(test_data.class_indices.keys())
 
 # Classification report
 print("\n" + "=" * 70)
@@ -455,6 +561,7 @@ plot_training_history(history1, history2)
 # 14. SAVE FINAL MODEL
 # =============================================
 best_model.save('models/final_medicinal_plant_model.h5')
+save_metadata('models/final_medicinal_plant_model.h5', class_names, input_size=IMG_SIZE)
 print("\nFinal model saved as 'models/final_medicinal_plant_model.h5'")
 
 print("\n" + "=" * 70)
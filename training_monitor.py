@@ -1,9 +1,14 @@
 import os
+import json
 import time
+import argparse
 import matplotlib.pyplot as plt
-from tensorflow import keras
 import numpy as np
-from PIL import Image
+
+from data_pipeline import ImageFolderDataset
+from image_pipeline import load_image
+from inference_backends import load_backend
+from model_metadata import get_class_names
 
 
 def monitor_training_progress():
@@ -14,26 +19,21 @@ def monitor_training_progress():
 
     if os.path.exists(model_path):
         print("Loading improved model for testing...")
-        model = keras.models.load_model(model_path)
+        model = load_backend(model_path)
 
         # Test with the same Arive-Dantu image
         test_image = "dataset/validation/Arive-Dantu/AV-S-001.jpg"
 
         if os.path.exists(test_image):
             # Load and preprocess
-            img = Image.open(test_image)
-            img = img.convert('RGB').resize((224, 224))
-            img_array = np.array(img) / 255.0
-            img_array = np.expand_dims(img_array, axis=0)
+            img_array = np.asarray(load_image(test_image), dtype=np.uint8)
 
             # Predict
-            predictions = model.predict(img_array)[0]
+            predictions = model.predict_one(img_array)
             predicted_idx = np.argmax(predictions)
 
-            # Get class names from training directory
-            train_dir = 'dataset/train'
-            class_names = sorted([d for d in os.listdir(train_dir)
-                                  if os.path.isdir(os.path.join(train_dir, d))])
+            # Get class names from the model's metadata
+            class_names = model.class_names or get_class_names(model_path)
 
             print("\n" + "=" * 60)
             print("IMPROVED MODEL TEST RESULTS")
@@ -66,60 +66,117 @@ def monitor_training_progress():
         print("Run this script again after training completes.")
 
 
-def compare_models():
-    """Compare old vs new model performance"""
-    old_model_path = 'models/best_model.h5'
-    new_model_path = 'models/improved_model.h5'
-
-    if os.path.exists(old_model_path) and os.path.exists(new_model_path):
-        print("\n" + "=" * 60)
-        print("MODEL COMPARISON: OLD vs NEW")
-        print("=" * 60)
-
-        old_model = keras.models.load_model(old_model_path)
-        new_model = keras.models.load_model(new_model_path)
-
-        test_image = "dataset/validation/Arive-Dantu/AV-S-001.jpg"
-
-        if os.path.exists(test_image):
-            # Load and preprocess
-            img = Image.open(test_image)
-            img = img.convert('RGB').resize((224, 224))
-            img_array = np.array(img) / 255.0
-            img_array = np.expand_dims(img_array, axis=0)
-
-            # Get class names
-            train_dir = 'dataset/train'
-            class_names = sorted([d for d in os.listdir(train_dir)
-                                  if os.path.isdir(os.path.join(train_dir, d))])
-
-            # Old model prediction
-            old_pred = old_model.predict(img_array)[0]
-            old_idx = np.argmax(old_pred)
-
-            # New model prediction
-            new_pred = new_model.predict(img_array)[0]
-            new_idx = np.argmax(new_pred)
-
-            print(f"\nTest Image: Arive-Dantu/AV-S-001.jpg")
-            print(f"\nOLD MODEL:")
-            print(f"  Prediction: {class_names[old_idx]}")
-            print(f"  Confidence: {old_pred[old_idx]:.4f} ({old_pred[old_idx] * 100:.2f}%)")
-            print(f"  Correct: {'✅' if class_names[old_idx] == 'Arive-Dantu' else '❌'}")
-
-            print(f"\nNEW MODEL:")
-            print(f"  Prediction: {class_names[new_idx]}")
-            print(f"  Confidence: {new_pred[new_idx]:.4f} ({new_pred[new_idx] * 100:.2f}%)")
-            print(f"  Correct: {'✅' if class_names[new_idx] == 'Arive-Dantu' else '❌'}")
-
-            # Calculate improvement
-            if class_names[new_idx] == 'Arive-Dantu' and class_names[old_idx] != 'Arive-Dantu':
-                print(f"\n🎉 IMPROVEMENT: Model now correctly identifies Arive-Dantu!")
-            elif new_pred[new_idx] > old_pred[old_idx] and class_names[new_idx] == 'Arive-Dantu':
-                improvement = (new_pred[new_idx] - old_pred[old_idx]) * 100
-                print(f"\n📈 IMPROVEMENT: Confidence increased by {improvement:.2f}%")
+def compare_models(model_paths, data_dir='dataset/validation', batch_size=32, dataset_cache=None, shards=None):
+    """
+    Compare N model artifacts on a whole split in a single pass.
+
+    The split is decoded once; every uint8 batch is fed to all models in
+    turn. The first model is the baseline for per-class deltas and
+    flipped predictions. Returns a dict of the results.
+    """
+    models = [load_backend(path) for path in model_paths]
+    input_shapes = {tuple(model.input_shape) for model in models}
+    if len(input_shapes) > 1:
+        raise ValueError(f"Models need the same input shape to share batches, got {sorted(input_shapes)}")
+    height, width = models[0].input_shape[:2]
+
+    data = ImageFolderDataset(data_dir, (height, width), batch_size, rescale=False,
+                              compiled=dataset_cache, shards=shards)
+
+    # Map every model's output columns onto the dataset's labels by class name
+    column_labels = []
+    for path, model in zip(model_paths, models):
+        names = model.class_names or get_class_names(path)
+        missing = [name for name in names if name not in data.class_indices]
+        if missing:
+            raise ValueError(f"{path} predicts classes missing from {data_dir}: {missing}")
+        column_labels.append(np.array([data.class_indices[name] for name in names]))
+
+    print(f"Comparing {len(models)} models on {data.samples} images from {data_dir}...")
+    labels = []
+    predictions = [[] for _ in models]
+    batch_ms = [[] for _ in models]
+    for images, one_hot in data.dataset:
+        images = images.numpy()
+        labels.append(np.argmax(one_hot.numpy(), axis=1))
+        for i, model in enumerate(models):
+            start = time.perf_counter()
+            probabilities = model.predict(images)
+            batch_ms[i].append((time.perf_counter() - start) * 1000)
+            predictions[i].append(column_labels[i][np.argmax(probabilities, axis=1)])
+
+    labels = np.concatenate(labels)
+    predictions = [np.concatenate(p) for p in predictions]
+    correct = [p == labels for p in predictions]
+    class_counts = np.bincount(labels, minlength=data.num_classes)
+
+    results = {'data_dir': data_dir, 'num_images': int(len(labels)), 'models': []}
+    for i, path in enumerate(model_paths):
+        per_class = np.bincount(labels[correct[i]], minlength=data.num_classes) / np.maximum(class_counts, 1)
+        times = np.array(batch_ms[i])
+        results['models'].append({
+            'path': path,
+            'accuracy': float(np.mean(correct[i])),
+            'per_class_accuracy': dict(zip(data.class_names, per_class.tolist())),
+            'batch_ms_median': float(np.median(times)),
+            'batch_ms_p95': float(np.percentile(times, 95)),
+            'ms_per_image': float(times.sum() / len(labels)),
+            # Against the baseline (first model)
+            'flipped': int(np.sum(predictions[i] != predictions[0])),
+            'fixed': int(np.sum(correct[i] & ~correct[0])),
+            'broken': int(np.sum(~correct[i] & correct[0]))
+        })
+
+    print_comparison(results, data.class_names)
+    return results
+
+
+def print_comparison(results, class_names, max_classes=15):
+    """Print the accuracy/latency table and the largest per-class changes against the baseline"""
+    models = results['models']
+    baseline = models[0]
+
+    print("\n" + "=" * 90)
+    print(f"MODEL COMPARISON ({results['num_images']} images from {results['data_dir']})")
+    print("=" * 90)
+    print(f"{'Model':32} {'Accuracy':>9} {'ms/batch':>9} {'p95':>8} {'ms/img':>7} "
+          f"{'Flipped':>8} {'Fixed':>6} {'Broken':>7}")
+    for model in models:
+        print(f"{os.path.basename(model['path']):32} {model['accuracy'] * 100:8.2f}% "
+              f"{model['batch_ms_median']:9.1f} {model['batch_ms_p95']:8.1f} {model['ms_per_image']:7.2f} "
+              f"{model['flipped']:8d} {model['fixed']:6d} {model['broken']:7d}")
+
+    for model in models[1:]:
+        deltas = sorted(((model['per_class_accuracy'][name] - baseline['per_class_accuracy'][name], name)
+                         for name in class_names), key=lambda d: -abs(d[0]))
+        print(f"\nPer-class accuracy change, {os.path.basename(model['path'])} vs "
+              f"{os.path.basename(baseline['path'])} (largest {max_classes}):")
+        for delta, name in deltas[:max_classes]:
+            marker = "📈" if delta > 0 else "📉" if delta < 0 else "  "
+            print(f"  {marker} {name:25} {baseline['per_class_accuracy'][name] * 100:6.1f}% -> "
+                  f"{model['per_class_accuracy'][name] * 100:6.1f}% ({delta * 100:+.1f})")
+    print("=" * 90)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monitor training and compare model checkpoints on a whole split")
+    parser.add_argument('--models', nargs='+', default=['models/best_model.h5', 'models/improved_model.h5'],
+                        help="Model artifacts to compare; the first is the baseline")
+    parser.add_argument('--data-dir', default='dataset/validation')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--dataset-cache', default=None, help="Compiled dataset cache root to read from")
+    parser.add_argument('--shards', default=None, help="Shard root to read from")
+    parser.add_argument('--output', default=None, help="Save the comparison as JSON")
+    args = parser.parse_args()
+
     monitor_training_progress()
-    compare_models()
\ No newline at end of file
+
+    model_paths = [path for path in args.models if os.path.exists(path)]
+    for path in sorted(set(args.models) - set(model_paths)):
+        print(f"⚠ Model not found, skipped: {path}")
+    if model_paths:
+        results = compare_models(model_paths, args.data_dir, args.batch_size, args.dataset_cache, args.shards)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"✓ Comparison saved to {args.output}")